@@ -1,4 +1,5 @@
 import fastapi
+import fastapi.responses
 from models import common
 from state import app_state
 
@@ -12,4 +13,76 @@ async def list_points() -> list[common.Point]:
 
 @router.get("/area_states")
 async def list_area_states() -> list[common.AreaState]:
-    return app_state.get_areas_states()
\ No newline at end of file
+    return app_state.get_areas_states()
+
+
+@router.get("/area_changes")
+async def stream_area_changes():
+    # server sent events, one per current area change
+    async def events():
+        with app_state.area_changes() as changes:
+            async for change in changes:
+                yield f"data: {change.model_dump_json()}\n\n"
+
+    return fastapi.responses.StreamingResponse(events(), media_type="text/event-stream")
+
+
+@router.get("/lidar_stats")
+async def get_lidar_stats() -> dict:
+    from lidar import app_lidar
+    return app_lidar.stats()
+
+
+@router.get("/display.mjpg")
+async def stream_display():
+    # motion jpeg of display, frames are encoded only while some client is connected
+    from display import app_display
+    if app_display.stream is None:
+        raise fastapi.HTTPException(status_code=404, detail="display is not enabled")
+
+    async def frames():
+        async for jpeg in app_display.stream.frames():
+            yield b"--frame\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n%b\r\n" % (len(jpeg), jpeg)
+
+    return fastapi.responses.StreamingResponse(frames(), media_type="multipart/x-mixed-replace; boundary=frame")
+
+
+@router.get(
+    "/display.png",
+    responses = {
+        200: {
+            "content": {"image/png": {}}
+        }
+    },
+)
+async def get_display_png():
+    from display import app_display
+    if app_display.stream is None or app_display.screen is None:
+        raise fastapi.HTTPException(status_code=404, detail="display is not running")
+    png = await app_display.stream.png(app_display.screen)
+    return fastapi.responses.Response(content=png, media_type="image/png")
+
+
+@router.get(
+    "/heatmap.png",
+    responses = {
+        200: {
+            "content": {"image/png": {}}
+        }
+    },
+)
+async def get_heatmap_png():
+    # grayscale, one pixel per heatmap cell, white is the busiest cell
+    return fastapi.responses.Response(content=app_state.get_heatmap().png(), media_type="image/png")
+
+
+@router.get("/heatmap.npy")
+async def get_heatmap_npy():
+    # float32 (rows, cols) grid of decayed point counts
+    return fastapi.responses.Response(content=app_state.get_heatmap().npy(), media_type="application/octet-stream")
+
+
+@router.get("/display_stats")
+async def get_display_stats() -> dict:
+    from display import app_display
+    return app_display.stats()
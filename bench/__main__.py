@@ -0,0 +1,92 @@
+# python -m bench [cases...] [--output results.json] [--baseline bench/baseline.json] [--save-baseline]
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+from . import cases
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def cpu() -> str:
+    # cpu model for labelling results, machine type if unknown
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith(("model name", "Model")):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        ...
+    return platform.processor() or platform.machine()
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, res in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if res["higher_is_better"]:
+            regressed = res["value"] < base["value"] * (1 - tolerance)
+        else:
+            regressed = res["value"] > base["value"] * (1 + tolerance)
+        change = (res["value"] / base["value"] - 1) * 100 if base["value"] else 0
+        mark = "REGRESSION" if regressed else ""
+        print(f"{name:55} {base['value']:12.3f} -> {res['value']:12.3f} {res['unit']:10} {change:+7.1f}% {mark}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m bench")
+    parser.add_argument("cases", nargs="*", help=f"cases to run: {', '.join(cases.cases)}")
+    parser.add_argument("--output", help="write results as json")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="store results as new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative change")
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.cases or cases.cases:
+        print(f"running {name}", file=sys.stderr)
+        results |= cases.cases[name]()
+
+    report = {
+        "time": time.time(),
+        "machine": platform.machine(),
+        "cpu": cpu(),
+        "python": platform.python_version(),
+        "results": results,
+    }
+
+    for name, res in results.items():
+        print(f"{name:55} {res['value']:12.3f} {res['unit']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"\ncompared with {args.baseline} ({baseline.get('cpu', baseline['machine'])})")
+        regressions = compare(results, baseline["results"], args.tolerance)
+    elif not args.save_baseline:
+        print(f"\nwarning: no baseline {args.baseline}, nothing compared - record one with --save-baseline")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
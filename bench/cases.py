@@ -0,0 +1,290 @@
+from typing import Callable
+import asyncio
+import os
+import time
+import numpy as np
+
+import models
+import state
+from . import synthetic
+
+PAINTING = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pictures/2024_2/painting2.yaml")
+
+SERIAL_CHUNK = 32 # typical size of single serial read
+
+cases: dict[str, Callable[[], dict]] = {}
+
+
+def case(name: str):
+    def register(fn):
+        cases[name] = fn
+        return fn
+    return register
+
+
+def result(value: float, unit: str, higher_is_better: bool) -> dict:
+    return {"value": value, "unit": unit, "higher_is_better": higher_is_better}
+
+
+def measure(fn: Callable, min_time: float = 0.2, repeat: int = 3) -> float:
+    # best time of single call in seconds
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def config() -> models.ConfigFile:
+    return models.ConfigFile(
+        picture_conf=PAINTING,
+        lidar=models.config_file.LidarConfig(serial=""),
+        api=models.config_file.ApiConfig(port=0),
+        display=models.config_file.DisplayConfig(scale=1),
+    )
+
+
+def scene(painting: models.PaintingFile, wall: float = 650) -> synthetic.Scene:
+    sc = synthetic.Scene(painting, wall=wall)
+    sc.hands = [(200, 300), (770, 300)]
+    return sc
+
+
+def lidar_protocol(painting: models.PaintingFile):
+    from lidar import Lidar
+    lid = Lidar()
+    lid.configure(config(), painting)
+    protocol = lid.create_protocol()
+    protocol.connection_made(None)
+    return lid, protocol
+
+
+def drain(protocol) -> list:
+    points = []
+    while not protocol.queue.empty():
+        points.append(protocol.queue.get_nowait())
+    return points
+
+
+@case("lidar")
+def bench_lidar() -> dict:
+    from lidar import decoder
+    painting = synthetic.painting_file(PAINTING)
+    stream = scene(painting).stream(10)
+    frames_count = len(stream) // decoder.FRAME_DTYPE.itemsize
+    _, protocol = lidar_protocol(painting)
+    protocol.budget.policy = 'all' # throughput of decoding every frame
+
+    def data_received():
+        for i in range(0, len(stream), SERIAL_CHUNK):
+            protocol.data_received(stream[i:i+SERIAL_CHUNK])
+            drain(protocol)
+
+    frames = np.frombuffer(stream, dtype=decoder.FRAME_DTYPE)
+
+    def decode_batch():
+        protocol.decoder.decode(frames)
+
+    def decode_frame():
+        for i in range(len(frames)):
+            protocol.decoder.decode(frames[i:i+1])
+
+    return {
+        "lidar.data_received": result(frames_count / measure(data_received), "frames/s", True),
+        "lidar.decode.batch": result(frames_count / measure(decode_batch), "frames/s", True),
+        "lidar.decode.frame": result(frames_count / measure(decode_frame), "frames/s", True),
+    }
+
+
+def configured_state(painting: models.PaintingFile, areas: int, points: int = 100, params: int = 1) -> state.State:
+    conf = config()
+    conf.state.points_count = points
+    st = state.State()
+    st.configure(conf, synthetic.grid_areas(painting, areas, params))
+    return st
+
+
+@case("state")
+def bench_state() -> dict:
+    painting = synthetic.painting_file(PAINTING)
+    rng = np.random.default_rng(0)
+    xy = rng.uniform((0, 0), (painting.area.w, painting.area.h), (1000, 2))
+    batches = np.split(xy, 100)
+    results = {}
+    for points in (100, 1000):
+        for areas in (4, 16, 64):
+            st = configured_state(painting, areas, points)
+
+            def add_point():
+                for p in xy:
+                    st.add_point(p)
+
+            def add_points():
+                for batch in batches:
+                    st.add_points(batch)
+
+            def get_current_area():
+                st.get_current_area()
+
+            results[f"state.add_point[areas={areas},points={points}]"] = result(
+                measure(add_point) / len(xy) * 1e6, "us/point", False)
+            results[f"state.add_points[areas={areas},points={points}]"] = result(
+                measure(add_points) / len(xy) * 1e6, "us/point", False)
+            results[f"state.get_current_area[areas={areas},points={points}]"] = result(
+                measure(get_current_area) * 1e6, "us", False)
+
+    for params in (1, 16):
+        st = configured_state(painting, 64, 100, params)
+        st.add_points(xy)
+
+        def get_current_areas():
+            st.get_current_areas()
+
+        results[f"state.get_current_areas[areas=64,params={params}]"] = result(
+            measure(get_current_areas) * 1e6, "us", False)
+    return results
+
+
+@case("render")
+def bench_render() -> dict:
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    import display
+
+    painting = synthetic.painting_file(PAINTING)
+    st = configured_state(painting, 4)
+    rng = np.random.default_rng(0)
+    st.add_points(rng.uniform((0, 0), (painting.area.w, painting.area.h), (100, 2)))
+
+    pygame.init()
+    try:
+        screen = pygame.display.set_mode((int(painting.area.w), int(painting.area.h)))
+        points = display.PointsObj(None, 1, st)
+        areas = display.AreasObj(None, 1, st)
+        loop = asyncio.new_event_loop()
+        try:
+            points_time = measure(lambda: loop.run_until_complete(points.draw(screen)))
+            areas_time = measure(lambda: loop.run_until_complete(areas.draw(screen)))
+        finally:
+            loop.close()
+    finally:
+        pygame.quit()
+
+    return {
+        "render.points": result(points_time * 1e3, "ms/frame", False),
+        "render.areas": result(areas_time * 1e3, "ms/frame", False),
+    }
+
+
+@case("latency")
+def bench_latency() -> dict:
+    # time from first lidar byte with a hand in area to area change, fed at real LD19 rate
+    painting = synthetic.painting_file(PAINTING)
+    empty = scene(painting, wall=0)
+    empty.hands = []
+    touch = scene(painting, wall=0)
+    touch.hands = [(200, 300)]
+    chunk = SERIAL_CHUNK
+    chunk_time = chunk / synthetic.BYTES_PER_SECOND
+
+    samples = []
+    for _ in range(3):
+        lid, protocol = lidar_protocol(painting)
+        st = state.State()
+        st.configure(config(), painting)
+        idle = empty.stream(2)
+        for i in range(0, len(idle), chunk):
+            protocol.data_received(idle[i:i+chunk])
+            drain(protocol)
+        st.get_current_area()
+
+        stream = touch.stream(50)
+        start = time.perf_counter()
+        for i in range(0, len(stream), chunk):
+            protocol.data_received(stream[i:i+chunk])
+            for points, t in drain(protocol):
+                st.add_points(points + (lid._lidar.x, lid._lidar.y), t)
+            area = st.get_current_area()
+            if area is not None and area.param_value == 1:
+                samples.append(time.perf_counter() - start)
+                break
+            time.sleep(max(0, start + (i // chunk + 1) * chunk_time - time.perf_counter()))
+
+    if not samples:
+        return {"latency.touch_to_area": result(float("inf"), "ms", False)}
+    return {"latency.touch_to_area": result(float(np.median(samples)) * 1e3, "ms", False)}
+
+
+def touch_capture(path: str, painting: models.PaintingFile, cycles: int = 8):
+    # capture of repeated touches - hand for 0.3 s, then empty long enough for points to expire
+    from lidar import capture
+    empty = scene(painting, wall=0)
+    empty.hands = []
+    touch = scene(painting, wall=0)
+    touch.hands = [(200, 300)]
+    chunk_time = SERIAL_CHUNK / synthetic.BYTES_PER_SECOND
+    writer = capture.CaptureWriter(path)
+    offset = 0
+    for _ in range(cycles):
+        for sc, revolutions in ((touch, 3), (empty, 12)):
+            stream = sc.stream(revolutions)
+            for i in range(0, len(stream), SERIAL_CHUNK):
+                writer.write(stream[i:i+SERIAL_CHUNK], writer.start_time + offset)
+                offset += chunk_time
+    writer.close()
+
+
+def replay_sound(path: str, painting: models.PaintingFile, speed: float = 1, tracking: bool = False) -> list[dict]:
+    # parameter changes recorded when capture is replayed through lidar, state and sound engine
+    from lidar import LidarGroup
+    import sound
+    conf = config()
+    conf.lidar.replay = path
+    conf.lidar.replay_speed = speed
+    conf.lidar.tracking = tracking
+    conf.sound.backend = 'recording'
+    state.app_state.configure(conf, painting)
+
+    async def run() -> list[dict]:
+        group = LidarGroup()
+        group.configure(conf, painting)
+        snd = sound.Sound()
+        snd.configure(conf, painting)
+        sound_task = asyncio.create_task(snd.run())
+        await group.run()
+        await asyncio.sleep(0.1)
+        sound_task.cancel()
+        await sound_task
+        return snd._backend.records
+
+    return asyncio.run(run())
+
+
+@case("sound")
+def bench_sound() -> dict:
+    # time from lidar frame with a hand in area to sound parameter set, capture of repeated touches replayed
+    # in real time through lidar, state and sound engine with recording backend
+    import tempfile
+    from sound import latency, recording
+    painting = synthetic.painting_file(PAINTING)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "touches.ld19")
+        touch_capture(path, painting)
+        records = replay_sound(path, painting)
+
+    res = latency.report(recording.latencies(records))
+    return {
+        f"latency.touch_to_sound.{p}": result(float(res.get(p, float("inf"))), "ms", False)
+        for p in ("p50", "p99")
+    }
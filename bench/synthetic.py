@@ -0,0 +1,82 @@
+import math as m
+import struct
+import numpy as np
+
+from lidar import decoder
+from lidar import framing
+
+POINTS_PER_REVOLUTION = 450 # LD19 at 10Hz
+FRAMES_PER_REVOLUTION = POINTS_PER_REVOLUTION // decoder.POINTS_PER_FRAME
+BYTES_PER_SECOND = FRAMES_PER_REVOLUTION * decoder.FRAME_DTYPE.itemsize * 10
+
+
+def encode_frame(start_angle: int, end_angle: int, distances, intensities, speed: int = 3600, timestamp: int = 0) -> bytes:
+    data = struct.pack('<BBHH', decoder.HEADER, decoder.VER_LEN, speed, start_angle)
+    for distance, intensity in zip(distances, intensities):
+        data += struct.pack('<HB', int(distance), int(intensity))
+    data += struct.pack('<HH', end_angle, timestamp)
+    frame = np.frombuffer(data + b'\0', dtype=decoder.FRAME_DTYPE)
+    return data + bytes([framing.crc8(frame)[0]])
+
+
+class Scene:
+    # synthetic LD19 output of lidar index of a painting with hands at given painting positions
+
+    def __init__(self, painting: 'models.PaintingFile', wall: float = 0, hand_radius: float = 40, index: int = 0):
+        self.lidar = painting.lidars[index]
+        self.wall = wall # background distance, 0 - no return
+        self.hand_radius = hand_radius
+        self.hands: list[tuple[float, float]] = []
+
+    def _distances(self, angles: np.ndarray) -> np.ndarray:
+        # raw lidar angle [0.01 deg] -> distance of nearest hand on the ray
+        theta = np.pi * (angles + self.lidar.angle * 100) / 18000
+        direction = np.column_stack((np.sin(theta), -np.cos(theta)))
+        distances = np.full(len(angles), np.inf)
+        for hx, hy in self.hands:
+            center = np.array((hx - self.lidar.x, hy - self.lidar.y))
+            along = direction @ center
+            across = np.abs(direction[:,0] * center[1] - direction[:,1] * center[0])
+            hit = (along > 0) & (across < self.hand_radius)
+            distances[hit] = np.minimum(distances[hit], along[hit])
+        distances[np.isinf(distances)] = self.wall
+        return distances
+
+    def revolution(self, start_angle: int = 0) -> bytes:
+        step = 36000 / FRAMES_PER_REVOLUTION
+        frames = []
+        for i in range(FRAMES_PER_REVOLUTION):
+            start = int(start_angle + i * step) % 36000
+            end = int(start_angle + (i + 1) * step - step / decoder.POINTS_PER_FRAME) % 36000
+            angles = np.linspace(start, start + (end - start) % 36000, decoder.POINTS_PER_FRAME)
+            frames.append(encode_frame(start, end, self._distances(angles), [255] * decoder.POINTS_PER_FRAME))
+        return b''.join(frames)
+
+    def stream(self, revolutions: int) -> bytes:
+        return self.revolution() * revolutions
+
+
+def painting_file(path: str) -> 'models.PaintingFile':
+    import yaml
+    import models
+    with open(path) as f:
+        return models.PaintingFile.model_validate(yaml.load(f, yaml.Loader))
+
+
+def grid_areas(painting: 'models.PaintingFile', count: int, params: int = 1) -> 'models.PaintingFile':
+    # copy of painting with count areas tiled over the painting area, areas dealt out to params parameters
+    import models
+    columns = max(1, m.ceil(m.sqrt(count * painting.area.w / painting.area.h)))
+    rows = m.ceil(count / columns)
+    w = int(painting.area.w / columns)
+    h = int(painting.area.h / rows)
+    values = [
+        models.Value(value=i, rect=models.Rect(x=(i % columns) * w, y=(i // columns) * h, w=w, h=h))
+        for i in range(count)
+    ]
+    bank_params = [
+        models.Param(id="area" if params == 1 else f"area{p}", values=values[p::params])
+        for p in range(params)
+    ]
+    music = painting.music.model_copy(update={"bank_params": bank_params})
+    return painting.model_copy(update={"music": music})
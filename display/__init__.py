@@ -1,23 +1,43 @@
 from abc import abstractmethod
 import os
 import asyncio
+import multiprocessing
 import threading
 import time
+import numpy as np
 import pygame
 
 import state
 import models
+from .clock import FrameClock
+from .stream import FrameStream
+from . import assets
+from . import process
+from state.shared import SharedPointRing
 
 disp: 'Display' = None
 
+AREA_CHANGED = pygame.event.custom_type() # event.change - models.AreaChange
+TILE = 16 # pixels, dirty rects of points are whole tiles
+
 
 class DisplayObject:
+    # static content is drawn once into cached layer, draw() adds dynamic content every frame
+    # and returns changed rects, they are restored from cached layer before next frame
+
     @abstractmethod
     def update(self):
         ...
 
+    async def prepare(self, screen: pygame.Surface):
+        # called once screen exists, e.g. to convert images to its format
+        ...
+
+    async def draw_static(self, surface: pygame.Surface):
+        ...
+
     @abstractmethod
-    def draw(self, screen):
+    def draw(self, screen) -> list[pygame.Rect]:
         ...
 
     @abstractmethod
@@ -32,16 +52,18 @@ class BackgroundObj(DisplayObject):
     async def update(self):
         ...
 
-    async def draw(self, screen: pygame.Surface):
-        screen.fill((0,0,0), screen.get_rect())
+    async def draw_static(self, surface: pygame.Surface):
+        surface.fill((0,0,0), surface.get_rect())
+
+    async def draw(self, screen: pygame.Surface) -> list[pygame.Rect]:
+        return []
 
     async def handle_event(self, event):
         ...
 
 class PictureObj(DisplayObject):
     def __init__(self, disp: 'Display', image_name: str, x:int, y: int, width: int, height: int):
-        self.obj = pygame.image.load(image_name)
-        self.obj = pygame.transform.scale(self.obj, (int(width), int(height)))        
+        self.obj = disp.assets.load(image_name, (int(width), int(height)))
         self.rect = self.obj.get_rect()
         self.rect = self.rect.move(x,y)
         self.speed = [2, 2]
@@ -50,16 +72,21 @@ class PictureObj(DisplayObject):
     async def update(self):
         ...
 
-    async def draw(self, screen):
-        screen.blit(self.obj, self.rect)
+    async def prepare(self, screen: pygame.Surface):
+        self.obj = assets.convert(self.obj, screen)
+
+    async def draw_static(self, surface: pygame.Surface):
+        surface.blit(self.obj, self.rect)
+
+    async def draw(self, screen) -> list[pygame.Rect]:
+        return []
 
     async def handle_event(self, event):
         ...
 
 class Spot(DisplayObject):
     def __init__(self, disp: 'Display', x:int, y: int):
-        self.obj = pygame.image.load('spot.png')
-        self.obj = pygame.transform.scale(self.obj, (25, 25))        
+        self.obj = disp.assets.load('spot.png', (25, 25))
         self.rect = self.obj.get_rect()
         self.rect = self.rect.move(x,y)
         self.speed = [2, 2]
@@ -68,8 +95,11 @@ class Spot(DisplayObject):
     async def update(self):
         ...
 
-    async def draw(self, screen):
-        screen.blit(self.obj, self.rect)
+    async def prepare(self, screen: pygame.Surface):
+        self.obj = assets.convert(self.obj, screen)
+
+    async def draw(self, screen) -> list[pygame.Rect]:
+        return [screen.blit(self.obj, self.rect)]
 
     async def handle_event(self, event):
         ...        
@@ -80,23 +110,60 @@ class AreasObj(DisplayObject):
         self._game = game
         self._state = st
         self._scale = scale
+        self._current_area = st.get_current_area()
 
     async def update(self):
         ...
 
-    async def draw(self, screen: pygame.Surface):
+    def _rect(self, area: models.Area) -> pygame.Rect:
+        return pygame.Rect(
+            area.rect.x * self._scale,
+            area.rect.y * self._scale,
+            area.rect.w * self._scale,
+            area.rect.h * self._scale
+        )
+
+    async def draw_static(self, surface: pygame.Surface):
         for area in self._state._areas:
-            if area == self._state.get_current_area():
-                color = (255,255,255)
-            else:
-                color = (0,0,128)
-            rect = pygame.Rect(
-                area.rect.x * self._scale,
-                area.rect.y * self._scale,
-                area.rect.w * self._scale,
-                area.rect.h * self._scale
-            )
-            pygame.draw.rect(screen, color, rect, 2)
+            pygame.draw.rect(surface, (0,0,128), self._rect(area), 2)
+
+    async def draw(self, screen: pygame.Surface) -> list[pygame.Rect]:
+        # only current area differs from static outlines
+        if self._current_area is None:
+            return []
+        return [pygame.draw.rect(screen, (255,255,255), self._rect(self._current_area), 2)]
+
+    async def handle_event(self, event):
+        if event.type == AREA_CHANGED:
+            self._current_area = event.change.area
+
+
+class HeatmapObj(DisplayObject):
+    # occupancy heatmap added in red to static layer, static layer is redrawn every period seconds
+
+    def __init__(self, game: 'Display', scale: float, st: state.State, period: float = 5):
+        self._game = game
+        self._scale = scale
+        self._state = st
+        self._period = period
+        self._drawn = 0.0
+
+    async def update(self):
+        if time.monotonic() - self._drawn >= self._period:
+            self._game.invalidate()
+
+    async def draw_static(self, surface: pygame.Surface):
+        self._drawn = time.monotonic()
+        heatmap = self._state.get_heatmap()
+        image = heatmap.image()
+        rgb = np.zeros(image.shape[::-1] + (3,), dtype=np.uint8)
+        rgb[:,:,0] = image.T
+        size = (int(heatmap.cols * heatmap.cell * self._scale), int(heatmap.rows * heatmap.cell * self._scale))
+        overlay = pygame.transform.scale(pygame.surfarray.make_surface(rgb), size)
+        surface.blit(overlay, (0,0), special_flags=pygame.BLEND_RGB_ADD)
+
+    async def draw(self, screen: pygame.Surface) -> list[pygame.Rect]:
+        return []
 
     async def handle_event(self, event):
         ...
@@ -104,44 +171,61 @@ class AreasObj(DisplayObject):
 
 class HandObj(DisplayObject):
     def __init__(self, game: 'Display', image_name: str, width: int, height: int):
-        self.obj = pygame.image.load(image_name)
-        self.obj = pygame.transform.scale(self.obj, (int(width), int(height)))
+        self.obj = game.assets.load(image_name, (int(width), int(height)))
         self.rect = self.obj.get_rect()
         self.game = game
 
     async def update(self):
         ...
 
+    async def prepare(self, screen: pygame.Surface):
+        self.obj = assets.convert(self.obj, screen)
+
 
-    async def draw(self, screen: pygame.Surface):
-        screen.blit(self.obj, self.rect)
+    async def draw(self, screen: pygame.Surface) -> list[pygame.Rect]:
+        return [screen.blit(self.obj, self.rect)]
 
     async def handle_event(self, event):
         ...                      
 
 
 class PointsObj(DisplayObject):
-    def __init__(self, game: 'Display', scale: float, st: state.State):
+    def __init__(self, game: 'Display', scale: float, st: state.State, fade: float = 0):
 
         self._state = st
         self.game = game
         self.point_size = 500       
         self.point_index = 0
         self._scale = scale
+        self._fade = fade # seconds until point fades out, 0 - no fading
 
     async def update(self):
         ...
 
 
-    async def draw(self, screen: pygame.Surface):
-        for point in self._state.get_points():
-            pygame.display.get_surface().set_at(
-                (
-                    int(point.pos[0] * self._scale),
-                    int(point.pos[1] * self._scale)
-                ),
-                point.color
-            )
+    async def draw(self, screen: pygame.Surface) -> list[pygame.Rect]:
+        # all points scattered at once into screen pixels
+        points = self._state.get_points_view()
+        pos = (points.xy * self._scale).astype(np.intp)
+        w, h = screen.get_size()
+        inside = (pos[:,0] >= 0) & (pos[:,0] < w) & (pos[:,1] >= 0) & (pos[:,1] < h)
+        if not inside.any():
+            return []
+        pos = pos[inside]
+        color = points.color[inside]
+        if self._fade > 0:
+            age = time.time() - points.t[inside]
+            color = (color * np.clip(1 - age / self._fade, 0, 1)[:,None]).astype(np.uint8)
+        pixels = pygame.surfarray.pixels2d(screen)
+        try:
+            pixels[pos[:,0], pos[:,1]] = pygame.surfarray.map_array(screen, color)
+        finally:
+            del pixels # unlocks screen
+
+        # tiles with points as dirty rects
+        cols = w // TILE + 1
+        tiles = np.unique(pos[:,1] // TILE * cols + pos[:,0] // TILE)
+        return [pygame.Rect(tile % cols * TILE, tile // cols * TILE, TILE, TILE) for tile in tiles.tolist()]
 
     async def handle_event(self, event):
         ...   
@@ -158,21 +242,47 @@ class PointsObj(DisplayObject):
 
 
 class Display:
+    _clock: FrameClock | None = None
+    _screen: pygame.Surface | None = None
+    stream: FrameStream | None = None
 
     def configure(self, conf: models.ConfigFile, painting_conf: models.PaintingFile):
 
-        self._FPS = 100
         self._state = state.app_state
+        self.inject = self._state.add_points # mouse points
+        self._process = conf.display.process
+        if self._process:
+            # everything else is configured in display process
+            self._conf = conf
+            self._painting = painting_conf
+            return
+
+        self._headless = conf.display.headless
+        fps = conf.display.headless_fps if self._headless else conf.display.fps
+        self._clock = FrameClock(fps, conf.display.min_fps)
+        self.stream = FrameStream()
+        if conf.enable_lidar:
+            self._lidar_dropped = 0
+            self._clock.pressure = self._lidar_pressure
         self._scale = conf.display.scale
         self._width = painting_conf.area.w * self._scale
         self._height =  painting_conf.area.h * self._scale
         self._screen: pygame.Surface = None        
         self._event_queue = asyncio.Queue()
         self._objects: list[DisplayObject] = [] 
+        self._static: pygame.Surface | None = None # cached static layer, None - has to be drawn
+        self.assets = assets.AssetCache(conf.display.assets_cache, self._scale)
 
         self.add_object(BackgroundObj(self))
 
         if conf.display.show_paintings:
+            self.assets.preload([
+                (
+                    os.path.join(state.picture_path, painting.image_file),
+                    (int(painting.w * conf.display.scale), int(painting.h * conf.display.scale))
+                )
+                for painting in painting_conf.paintings
+            ])
             for painting in painting_conf.paintings:
                 self.add_object(PictureObj(
                     self,
@@ -183,12 +293,15 @@ class Display:
                     painting.h * conf.display.scale            
                 ))
 
+        if conf.display.show_heatmap:
+            self.add_object(HeatmapObj(self, conf.display.scale, self._state))
+
         if conf.display.show_areas:
             areas_obj = AreasObj(self, conf.display.scale, self._state)
             self.add_object(areas_obj)
 
         if conf.display.show_points:
-            points_obj = PointsObj(self, conf.display.scale, self._state) 
+            points_obj = PointsObj(self, conf.display.scale, self._state, conf.display.points_fade)
             self.add_object(points_obj)
        
 
@@ -208,7 +321,28 @@ class Display:
     def screen(self):
         return self._screen
 
+    def stats(self) -> dict:
+        # frame rate and rendering times
+        if self._clock is None:
+            return {}
+        return self._clock.stats()
+
+    def _lidar_pressure(self) -> bool:
+        # lidar had to drop frames to stay in its cpu budget since last check
+        from lidar import app_lidar
+        dropped = app_lidar.stats()["dropped"]
+        pressure = dropped > self._lidar_dropped
+        self._lidar_dropped = dropped
+        return pressure
+
     async def run(self):
+        if self._process:
+            await self.run_process()
+            return
+        if self._headless:
+            await self.run_headless()
+            return
+
         # start event handler in separate thread            
         loop = asyncio.get_event_loop()
         stop = threading.Event()
@@ -216,12 +350,14 @@ class Display:
         event_loop_thread = threading.Thread(target=self.event_loop, args=(loop, self._event_queue, ready, stop))
         event_loop_thread.start()
         ready.wait()
+        await self.prepare()
 
         draw_task = asyncio.create_task(self.draw_coroutine())
         event_task = asyncio.create_task(self.event_coroutine())
+        area_task = asyncio.create_task(self.area_coroutine())
         
         try:
-            done,pending = await asyncio.wait([draw_task, event_task], return_when=asyncio.FIRST_COMPLETED)
+            done,pending = await asyncio.wait([draw_task, event_task, area_task], return_when=asyncio.FIRST_COMPLETED)
             for task in pending:
                 task.cancel()
             for task in done:
@@ -233,9 +369,75 @@ class Display:
         event_loop_thread.join()
         draw_task.cancel()
         event_task.cancel()
+        area_task.cancel()
+        self.stream.close()
         print(f"display closed") 
 
 
+    async def run_headless(self):
+        # offscreen rendering without window and events, frames are only available through api
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        pygame.init()
+        self._screen = pygame.Surface((int(self.width), int(self.height)))
+        await self.prepare()
+        area_task = asyncio.create_task(self.area_coroutine())
+        try:
+            await self.draw_coroutine()
+        finally:
+            area_task.cancel()
+            self.stream.close()
+            pygame.quit()
+            print(f"display closed")
+
+
+    async def run_process(self):
+        # display in separate process, it gets added points through shared memory and sends mouse points back
+
+        ring = SharedPointRing(process.RING_SIZE)
+        context = multiprocessing.get_context('spawn')
+        reader, writer = context.Pipe(duplex=False)
+        stop = context.Event()
+        display_process = context.Process(
+            target=process.run,
+            args=(self._conf, self._painting, state.picture_path, ring.name, writer, stop),
+            name="display",
+            daemon=True
+        )
+        self._state.add_points_listener(ring.write)
+        display_process.start()
+        writer.close()
+        print(f"display process started pid: {display_process.pid}")
+
+        loop = asyncio.get_running_loop()
+        closed = loop.create_future()
+
+        def receive():
+            try:
+                while reader.poll():
+                    self._state.add_points(reader.recv())
+            except (EOFError, OSError):
+                if not closed.done():
+                    closed.set_result(None)
+
+        loop.add_reader(reader.fileno(), receive)
+        try:
+            await closed
+            print(f"display process ended")
+        except asyncio.CancelledError:
+            print(f"display canceled")
+        finally:
+            loop.remove_reader(reader.fileno())
+            reader.close()
+            self._state.remove_points_listener(ring.write)
+            stop.set()
+            await loop.run_in_executor(None, display_process.join, 2)
+            if display_process.is_alive():
+                display_process.terminate()
+            ring.close()
+            ring.unlink()
+            print(f"display closed")
+
+
     def close(self):
         pygame.event.post(pygame.event.Event(pygame.QUIT, {}))
 
@@ -264,18 +466,35 @@ class Display:
             pygame.quit()
 
 
+    async def prepare(self):
+        for obj in self._objects:
+            await obj.prepare(self._screen)
+
+
+    async def draw_static(self):
+        self._static = self._screen.copy()
+        for obj in self._objects:
+            await obj.draw_static(self._static)
+
+
     async def draw_coroutine(self):
-        black = 0, 0, 0
-        current_time = 0
+        dirty: list[pygame.Rect] = [] # changed by dynamic objects in last frame
         try:
             while True:
-                last_time, current_time = current_time, time.time()
-                await asyncio.sleep(1 / self._FPS - (current_time - last_time))  # tick                
-                self._screen.fill(black)
+                await self._clock.tick()
+                if self._static is None:
+                    await self.draw_static()
+                    dirty = [self._screen.get_rect()]
+                restore = dirty
+                self._screen.blits([(self._static, rect, rect) for rect in restore], doreturn=False)
+                dirty = []
                 for obj in self._objects:
                     await obj.update()
-                    await obj.draw(self._screen)
-                pygame.display.flip()
+                    dirty += await obj.draw(self._screen)
+                if not self._headless:
+                    pygame.display.update(restore + dirty)
+                self.stream.publish(self._screen)
+                self._clock.done()
         except asyncio.exceptions.CancelledError as e:
             print(f"draw_coroutine cancelled")
         except Exception as e:
@@ -286,19 +505,24 @@ class Display:
     async def event_coroutine(self):
         try:
             while True:
-                event: pygame.event.Event = await self._event_queue.get()
-                if event.type == pygame.QUIT:
-                    break
-                elif event.type == pygame.MOUSEMOTION:
-                    pos = event.dict['pos']                    
-                    self._state.add_point((pos[0]/self._scale, pos[1]/self._scale))
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    pos = event.dict['pos']                    
-                    print(f"{pos[0]/self._scale}, {pos[1]/self._scale}")
+                events: list[pygame.event.Event] = [await self._event_queue.get()]
+                while not self._event_queue.empty():
+                    events.append(self._event_queue.get_nowait())
 
+                # all pending mouse moves go to state at once
+                moves = [event.dict['pos'] for event in events if event.type == pygame.MOUSEMOTION]
+                if moves:
+                    self.inject(np.array(moves, dtype=float) / self._scale)
 
-                for obj in self._objects:
-                    await obj.handle_event(event)
+                for event in events:
+                    if event.type == pygame.QUIT:
+                        return
+                    elif event.type == pygame.MOUSEBUTTONDOWN:
+                        pos = event.dict['pos']
+                        print(f"{pos[0]/self._scale}, {pos[1]/self._scale}")
+
+                    for obj in self._objects:
+                        await obj.handle_event(event)
 
         except asyncio.exceptions.CancelledError as e:
             print(f"event_coroutine cancelled")
@@ -307,8 +531,27 @@ class Display:
             raise
 
 
+    async def area_coroutine(self):
+        # pass area changes to display objects as events
+        try:
+            with self._state.area_changes() as changes:
+                async for change in changes:
+                    event = pygame.event.Event(AREA_CHANGED, change=change)
+                    for obj in self._objects:
+                        await obj.handle_event(event)
+
+        except asyncio.exceptions.CancelledError as e:
+            print(f"area_coroutine cancelled")
+
+
     def add_object(self, obj: DisplayObject):
         self._objects.append(obj)
+        self.invalidate()
+
+
+    def invalidate(self):
+        # static layer is redrawn before next frame
+        self._static = None
 
 
 app_display = Display()
\ No newline at end of file
@@ -0,0 +1,79 @@
+import concurrent.futures
+import hashlib
+import os
+import struct
+import pygame
+
+HEADER = struct.Struct('<4sqIIB') # magic, source mtime, width, height, alpha
+MAGIC = b'IMG2'
+
+
+class AssetCache:
+    # images scaled to their display size, kept in memory and as raw pixels on disk
+    # disk entry is keyed by source file, target size and display scale and holds mtime of source -
+    # changed image is scaled again and replaces the entry
+
+    def __init__(self, directory: str | None = None, scale: float = 1):
+        self.directory = directory
+        self.scale = scale
+        self._images: dict[tuple[str, tuple[int, int]], pygame.Surface] = {}
+
+    def _path(self, image_name: str, size: tuple[int, int]) -> str:
+        key = f"{os.path.abspath(image_name)}|{size[0]}x{size[1]}|{self.scale}"
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest() + ".raw")
+
+    def _read(self, path: str, mtime: int) -> pygame.Surface | None:
+        try:
+            with open(path, 'rb') as f:
+                magic, source_mtime, w, h, alpha = HEADER.unpack(f.read(HEADER.size))
+                if magic != MAGIC or source_mtime != mtime:
+                    return None
+                return pygame.image.frombytes(f.read(), (w, h), 'RGBA' if alpha else 'RGB')
+        except (OSError, struct.error, ValueError):
+            return None
+
+    def _write(self, path: str, mtime: int, image: pygame.Surface):
+        alpha = bool(image.get_flags() & pygame.SRCALPHA)
+        tmp = f"{path}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, mtime, image.get_width(), image.get_height(), alpha))
+            f.write(pygame.image.tobytes(image, 'RGBA' if alpha else 'RGB'))
+        os.replace(tmp, path)
+
+    def _load(self, image_name: str, size: tuple[int, int]) -> pygame.Surface:
+        path = None
+        if self.directory is not None:
+            path = self._path(image_name, size)
+            mtime = os.stat(image_name).st_mtime_ns
+            image = self._read(path, mtime)
+            if image is not None:
+                return image
+        image = pygame.transform.scale(pygame.image.load(image_name), size)
+        if path is not None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._write(path, mtime, image)
+        return image
+
+    def load(self, image_name: str, size: tuple[int, int]) -> pygame.Surface:
+        key = (image_name, size)
+        if key not in self._images:
+            self._images[key] = self._load(image_name, size)
+        return self._images[key]
+
+    def preload(self, images: list[tuple[str, tuple[int, int]]], workers: int = 4):
+        # decode and scale several images at once, pygame releases GIL while decoding
+        missing = [key for key in dict.fromkeys(images) if key not in self._images]
+        if not missing:
+            return
+        with concurrent.futures.ThreadPoolExecutor(min(workers, len(missing))) as pool:
+            for key, image in zip(missing, pool.map(lambda key: self._load(*key), missing)):
+                self._images[key] = image
+
+
+def convert(image: pygame.Surface, screen: pygame.Surface) -> pygame.Surface:
+    # image in screen pixel format, blits then copy pixels without conversion
+    alpha = image.get_flags() & pygame.SRCALPHA
+    if pygame.display.get_surface() is None:
+        # offscreen rendering has no display format
+        return image if alpha else image.convert(screen)
+    return image.convert_alpha() if alpha else image.convert()
@@ -0,0 +1,86 @@
+from typing import Callable
+import asyncio
+import collections
+import time
+import numpy as np
+
+ADJUST_PERIOD = 0.5 # seconds between frame rate adjustments
+BUSY_LIMIT = 0.5 # part of frame period rendering can take before frame rate goes down
+
+
+class FrameClock:
+    # frames start on monotonic deadlines, when rendering falls behind missed frames are skipped
+    # frame rate goes down towards min_fps while rendering takes too long or pressure() reports cpu is needed elsewhere
+    # and slowly back up to target fps
+    #
+    # while True:
+    #     await clock.tick()
+    #     ... render ...
+    #     clock.done()
+
+    def __init__(self, fps: float = 100, min_fps: float = 10, window: int = 256):
+        self.target_fps = fps
+        self.min_fps = min(min_fps, fps)
+        self.fps = fps
+        self.pressure: Callable[[], bool] | None = None
+        self.frames = 0
+        self.skipped = 0
+        self._starts = collections.deque(maxlen=window)
+        self._render_times = collections.deque(maxlen=window)
+        self._deadline: float | None = None
+        self._start = 0.0
+        self._adjusted = time.monotonic()
+        self._busy = 0.0 # rendering time since last adjustment
+        self._busy_frames = 0
+
+    async def tick(self):
+        now = time.monotonic()
+        period = 1 / self.fps
+        if self._deadline is None:
+            self._deadline = now
+        else:
+            self._deadline += period
+            if now - self._deadline >= period:
+                missed = int((now - self._deadline) / period)
+                self._deadline += missed * period
+                self.skipped += missed
+        await asyncio.sleep(max(0, self._deadline - now))
+        self._start = time.monotonic()
+        self._starts.append(self._start)
+
+    def done(self):
+        end = time.monotonic()
+        render_time = end - self._start
+        self._render_times.append(render_time)
+        self.frames += 1
+        self._busy += render_time
+        self._busy_frames += 1
+        if end - self._adjusted >= ADJUST_PERIOD:
+            self._adjust(end)
+
+    def _adjust(self, now: float):
+        busy = self._busy / self._busy_frames * self.fps
+        loaded = busy > BUSY_LIMIT or (self.pressure is not None and self.pressure())
+        if loaded:
+            self.fps = max(self.min_fps, self.fps * 0.8)
+        else:
+            self.fps = min(self.target_fps, self.fps + self.target_fps * 0.05)
+        self._adjusted = now
+        self._busy = 0.0
+        self._busy_frames = 0
+
+    def stats(self) -> dict:
+        times = np.array(self._render_times) * 1e3
+        fps = 0.0
+        if len(self._starts) > 1:
+            fps = (len(self._starts) - 1) / (self._starts[-1] - self._starts[0])
+        return {
+            "fps": fps,
+            "fps_limit": self.fps,
+            "target_fps": self.target_fps,
+            "frames": self.frames,
+            "skipped": self.skipped,
+            "render_ms_mean": float(times.mean()) if len(times) else 0.0,
+            "render_ms_p50": float(np.percentile(times, 50)) if len(times) else 0.0,
+            "render_ms_p99": float(np.percentile(times, 99)) if len(times) else 0.0,
+        }
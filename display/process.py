@@ -0,0 +1,52 @@
+import asyncio
+
+import models
+import state
+from state.shared import SharedPointRing
+
+RING_SIZE = 8192 # points buffered between main and display process
+POLL_PERIOD = 0.01 # seconds between reads of shared points
+
+
+def run(conf: models.ConfigFile, painting: models.PaintingFile, picture_path: str, ring_name: str, points, stop):
+    # entry point of display process
+    # display works with its own copy of state, fed by points added in main process through shared ring
+    # mouse points go back to main process through points pipe
+    try:
+        asyncio.run(_run(conf, painting, picture_path, ring_name, points, stop))
+    except KeyboardInterrupt:
+        ...
+
+
+async def _run(conf: models.ConfigFile, painting: models.PaintingFile, picture_path: str, ring_name: str, points, stop):
+    from . import app_display
+
+    state.picture_path = picture_path
+    conf = conf.model_copy(update={
+        "enable_lidar": False,
+        "display": conf.display.model_copy(update={"process": False}),
+        # saved heatmap is loaded as in main process, only main process saves it
+        "state": conf.state.model_copy(update={"heatmap_save_period": float("inf")}),
+    })
+    state.app_state.configure(conf, painting)
+    app_display.configure(conf, painting)
+    app_display.inject = points.send
+
+    ring = SharedPointRing(RING_SIZE, ring_name)
+    display_task = asyncio.create_task(app_display.run())
+    try:
+        while not stop.is_set() and not display_task.done():
+            xy, t = ring.read()
+            if len(xy):
+                state.app_state.add_points(xy, t)
+            await asyncio.sleep(POLL_PERIOD)
+    finally:
+        display_task.cancel()
+        try:
+            await display_task
+        except asyncio.CancelledError:
+            ...
+        if ring.lost:
+            print(f"display process points lost: {ring.lost}")
+        ring.close()
+        points.close()
@@ -0,0 +1,60 @@
+from typing import AsyncIterator
+import asyncio
+import concurrent.futures
+import io
+import pygame
+
+
+def encode(surface: pygame.Surface, namehint: str) -> bytes:
+    # image format is given by extension of namehint
+    data = io.BytesIO()
+    pygame.image.save(surface, data, namehint)
+    return data.getvalue()
+
+
+class FrameStream:
+    # rendered display frames for api clients, encoded in thread pool
+    # jpeg frames are encoded only while some client iterates frames(), one encoding is shared by all clients
+
+    def __init__(self, workers: int = 2):
+        self.clients = 0
+        self.jpeg: bytes | None = None
+        self._pool = concurrent.futures.ThreadPoolExecutor(workers, thread_name_prefix="display encoder")
+        self._encoding = False
+        self._next: asyncio.Future | None = None
+
+    def publish(self, surface: pygame.Surface):
+        # called after every frame, frames are dropped while previous one is still being encoded
+        if not self.clients or self._encoding:
+            return
+        self._encoding = True
+        loop = asyncio.get_running_loop()
+        loop.run_in_executor(self._pool, encode, surface.copy(), "frame.jpg").add_done_callback(self._encoded)
+
+    def _encoded(self, encoding: asyncio.Future):
+        self._encoding = False
+        if encoding.cancelled():
+            return
+        if encoding.exception() is not None:
+            print(f"display frame encoding failed: {encoding.exception()}")
+            return
+        self.jpeg = encoding.result()
+        if self._next is not None and not self._next.done():
+            self._next.set_result(self.jpeg)
+
+    async def frames(self) -> AsyncIterator[bytes]:
+        # jpeg of every encoded frame, slow client skips frames
+        self.clients += 1
+        try:
+            while True:
+                if self._next is None or self._next.done():
+                    self._next = asyncio.get_running_loop().create_future()
+                yield await asyncio.shield(self._next)
+        finally:
+            self.clients -= 1
+
+    async def png(self, surface: pygame.Surface) -> bytes:
+        return await asyncio.get_running_loop().run_in_executor(self._pool, encode, surface.copy(), "frame.png")
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
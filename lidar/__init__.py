@@ -1,6 +1,7 @@
-from typing import Literal
+from typing import AsyncIterator, Callable
 import asyncio
-import struct
+import multiprocessing
+import os
 import math as m
 import numpy as np
 import time
@@ -8,6 +9,14 @@ import serial_asyncio
 
 import models
 import state
+from . import decoder
+from . import framing
+from . import capture
+from . import budget
+from . import background
+from . import tracking
+from . import worker
+from state.shared import SharedPointRing
 
 min_distance = 50
 
@@ -31,105 +40,84 @@ class LidarProtocol(asyncio.Protocol):
             m.sqrt( (x_min)**2 + (y_max)**2 )
         ) 
         print(f"x_min: {x_min} y_min: {y_min} x_max: {x_max} y_max: {y_max} max_distance: {self.max_distance}")
-        self.last_pos = (0,0)
-        self.last_dist = None
         self.resolution = 5
-        self.interleave = 3
-        self.interleave_sequence = 0
+        self.budget = budget.FrameBudget()
+        self.recorder: capture.CaptureWriter | None = None
+        self.clock = time.time # replay transport gives clock of capture
+        self.capture_clock = True # use it
+        self.replaying = False
+        self.ended = False
+        self.sync = framing.FrameSync()
+        self.decoder = decoder.FrameDecoder(
+            x_min, y_min, x_max, y_max,
+            min_intensity, max_intensity,
+            self.min_distance, self.max_distance,
+            self.angle, self.resolution
+        )
         
 
     def connection_made(self, transport):
         self.transport = transport
-        self.state: Literal['IDLE', 'LENGTH', 'DATA'] = 'IDLE'
-        self.buffer: bytes = b''
-        self.length = 0
-        
+        clock = transport.get_extra_info('clock') if transport is not None else None
+        if clock is not None and self.capture_clock:
+            self.clock = clock
+            self.replaying = True
         print('Lidar port opened', transport)
 
 
-    def process_data(self, buffer):
+    def process_data(self, frames: np.ndarray, t: float):
 
-        speed, start = struct.unpack('<HH', self.buffer[0:4])
-        data = np.zeros((self.length,2))
-        for i in range(self.length):
-            tmp = struct.unpack('<HB', self.buffer[4+i*3 : 4+i*3+3]) 
-            data[i,:] = tmp              
-        stop, timestamp = struct.unpack('<HH', self.buffer[4+self.length*3 : 4+self.length*3+4]) # seems this model have no checksum
+        points = self.decoder.decode(frames, t)
+        if len(points):
+            try:
+                self.queue.put_nowait((points, t))
+            except asyncio.QueueFull:
+                ...
 
-        for (dist, intensity), angle in zip(
-            data,
-            np.linspace(
-                m.pi*(start+self.angle)/18000,
-                m.pi*(stop+self.angle)/18000,
-                num=self.length
-            )
-        ):
 
-            # filter big distance change - usually caused by lidar glitches
-            if self.last_dist is None or abs(self.last_dist - dist) < self.max_distance:
-                self.last_dist = dist
-            else:
-                self.last_dist = None
-                break
-            
-            # process only points in intensity and distance limit
-            if (
-                self.min_intensity < intensity < self.max_intensity
-                and self.min_distance < dist < self.max_distance
-            ):
-                y = -dist*m.cos(angle) # marker up
-                x = dist*m.sin(angle)
-                # process only points in given area with given resolution
-                if (
-                    self.x_min < x < self.x_max
-                    and self.y_min < y < self.y_max
-                    and not all(np.isclose((x,y), self.last_pos, atol=self.resolution))
-                ):
-                    self.last_pos = (x,y)
-                    try:
-                        self.queue.put_nowait((x,y))
-                    except asyncio.QueueFull:
-                        ...
-
-
-
-    def data_received(self, recv_data: bytes):         
-        # print(self.interleave, len(recv_data))  
-        if len(recv_data) > 50:
-            self.interleave += 1
-        else:
-            self.interleave = max(1,self.interleave-1)
-        for c in recv_data:  
-            try:         
-                if self.state == 'IDLE':
-                    if c == 0x54:                    
-                        self.state = 'LENGTH'
-                elif self.state == 'LENGTH':
-                    ver_len = c
-                    self.length = ver_len & 0x1F
-                    self.buffer = b''
-                    self.state = 'DATA'
-                elif self.state == 'DATA':
-                    if len(self.buffer) == self.length * 3 + 8:
-                        if self.interleave_sequence >= self.interleave:
-                            self.process_data(self.buffer)
-                            self.interleave_sequence = 0
-                        self.interleave_sequence += 1
-                        self.buffer = b''
-                        self.state = 'IDLE'
-                    else:
-                        self.buffer += c.to_bytes(1, 'little')
-            except Exception as e:
-                print(e)
-
-
-    async def read(self):
-        points = [await self.queue.get()]
+    def data_received(self, recv_data: bytes):
+        if self.recorder is not None:
+            self.recorder.write(recv_data)
+        t = self.clock()
+        try:
+            for frames in self.sync.feed(recv_data):
+                selected = self.budget.select(frames)
+                if len(selected):
+                    start = time.perf_counter()
+                    self.process_data(selected, t)
+                    self.budget.spent(len(selected), time.perf_counter() - start)
+        except Exception as e:
+            print(e)
+        if self.replaying and self.queue.empty():
+            # capture clock moves only with data, reader learns about the time even without points
+            self.queue.put_nowait((np.empty((0,2)), t))
+
+
+    def eof_received(self):
+        self.ended = True
+        try:
+            self.queue.put_nowait(None)
+        except asyncio.QueueFull:
+            # reader finds out after reading waiting points
+            ...
+
+
+    async def read(self) -> tuple[np.ndarray, np.ndarray]:
+        # all waiting points as (n,2) x,y array and (n,) array of receive times, EOFError after end of data
+        if self.ended and self.queue.empty():
+            raise EOFError
+        batches = [await self.queue.get()]
         while True:
             try:
-                points += [self.queue.get_nowait()]
+                batches.append(self.queue.get_nowait())
             except asyncio.QueueEmpty:
-                return points
+                break
+        batches = [batch for batch in batches if batch is not None]
+        if not batches:
+            raise EOFError
+        points = np.concatenate([points for points, _ in batches])
+        times = np.concatenate([np.full(len(points), t) for points, t in batches])
+        return points, times
                     
 
 
@@ -137,7 +125,9 @@ class LidarProtocol(asyncio.Protocol):
 
     def connection_lost(self, exc):
         print('port closed')
-        self.transport.loop.stop()
+        if exc is not None:
+            # port lost, not closed by us
+            self.transport.loop.stop()
 
     def pause_reading(self):
         self.transport.pause_reading()
@@ -148,52 +138,286 @@ class LidarProtocol(asyncio.Protocol):
 
 
 
+def sensor_value(value, index: int):
+    # config value shared by all lidars or list with value for every lidar
+    return value[index] if isinstance(value, list) else value
+
+
+def check_sensor_values(conf: models.config_file.LidarConfig, count: int):
+    # every lidar needs its own port, lists must have value for every lidar
+    if count > 1 and not isinstance(conf.serial, list):
+        raise ValueError(f"lidar.serial must be a list of {count} ports, one for every lidar of painting")
+    for name in ("serial", "record", "replay"):
+        value = getattr(conf, name)
+        if isinstance(value, list) and len(value) != count:
+            raise ValueError(f"lidar.{name} has {len(value)} values, painting has {count} lidars")
+
+
 class Lidar():
+    # single lidar sensor
     _protocol = None
+    _ring = None
+    _decimation = None
     _transport = None
     _pos_queue = None
     _lidar_pos = (0,0)
+    capture_clock = True # replayed points and state run on time of capture, worker keeps real time
 
     areas_rects = np.empty((0,4))
 
-    def configure(self, conf: models.ConfigFile, conf_painting: models.PaintingFile):
+    def configure(self, conf: models.ConfigFile, conf_painting: models.PaintingFile, index: int = 0):
 
-        self._state = state.app_state
-        self._lidar = conf_painting.lidar
+        check_sensor_values(conf.lidar, len(conf_painting.lidars))
+        self._index = index
+        self._lidar = conf_painting.lidars[index]
         self._area = conf_painting.area
-        self._serial = conf.lidar.serial
+        self._serial = sensor_value(conf.lidar.serial, index)
+        self._record = sensor_value(conf.lidar.record, index)
+        if self._record and len(conf_painting.lidars) > 1 and not isinstance(conf.lidar.record, list):
+            root, ext = os.path.splitext(self._record)
+            self._record = f"{root}.{index}{ext}"
+        self._replay = sensor_value(conf.lidar.replay, index)
+        self._replay_speed = conf.lidar.replay_speed
+        self._worker = conf.lidar.worker
+        self._ring_size = conf.lidar.worker_ring_size
+        self._decimation = conf.lidar.decimation
+        self._cpu_budget = conf.lidar.cpu_budget
+        self._background = conf.lidar.background
+        self._background_calibration = conf.lidar.background_calibration
+        self._background_adapt = conf.lidar.background_adapt
+        self._background_margin = conf.lidar.background_margin
+        self._conf = conf
+        self._painting = conf_painting
+
+    def create_protocol(self) -> LidarProtocol:
+        protocol = LidarProtocol(
+            -self._lidar.x,
+            -self._lidar.y,
+            self._area.w-self._lidar.x,
+            self._area.h-self._lidar.y,
+            220,
+            500,
+            self._lidar.angle)
+        protocol.budget = budget.FrameBudget(self._decimation, self._cpu_budget)
+        if self._background:
+            protocol.decoder.background = background.BackgroundModel(
+                protocol.max_distance,
+                margin=self._background_margin,
+                calibration=self._background_calibration,
+                adapt=self._background_adapt
+            )
+        if self._record:
+            protocol.recorder = capture.CaptureWriter(self._record)
+        protocol.capture_clock = self.capture_clock
+        return protocol
 
-    async def run(self):
+    async def read_points(self) -> AsyncIterator[tuple[np.ndarray, np.ndarray]]:
+        # batches of points in painting coordinates with their receive times
 
         loop = asyncio.get_running_loop()
-        _transport, _protocol = await serial_asyncio.create_serial_connection(
-            loop,
-            lambda: LidarProtocol(
-                -self._lidar.x,
-                -self._lidar.y,
-                self._area.w-self._lidar.x,
-                self._area.h-self._lidar.y,
-                220,
-                500,
-                self._lidar.angle),
-            self._serial,
-            baudrate=230400
-        )              
-        
+        if self._replay:
+            _transport, _protocol = await capture.create_replay_connection(
+                loop,
+                self.create_protocol,
+                self._replay,
+                self._replay_speed
+            )
+            if self.capture_clock:
+                # replay is the same at any speed only if expiry of points follows the capture
+                state.app_state.clock = _transport.time
+                state.app_state.real_clock = _transport.real_time
+        else:
+            _transport, _protocol = await serial_asyncio.create_serial_connection(
+                loop,
+                self.create_protocol,
+                self._serial,
+                baudrate=230400
+            )
+        self._protocol = _protocol
+
         try:
             while True:
-                current_points = await _protocol.read()
-                current_points = [(self._lidar.x + point[0], self._lidar.y + point [1]) for point in current_points]
+                points, times = await _protocol.read()
+                points += (self._lidar.x, self._lidar.y)
+                yield points, times
 
-                for point in current_points:
-                    self._state.add_point(point)
+        except EOFError:
+            print(f"lidar {self._index} data ended")
 
         except asyncio.CancelledError:
-            print(f"lidar canceled")
+            print(f"lidar {self._index} canceled")
 
         finally:
             _transport.close()
-            print(f"lidar closed") 
+            if _protocol.recorder is not None:
+                _protocol.recorder.close()
+            print(f"lidar {self._index} frames: {_protocol.budget.stats()}")
+            print(f"lidar {self._index} closed") 
+
+
+    def stats(self) -> dict:
+        # frames received from lidar, decoded and dropped to stay in cpu budget
+        if self._ring is not None:
+            received, processed, dropped = self._ring.counters.tolist()
+            return {"policy": self._decimation, "received": received, "processed": processed, "dropped": dropped}
+        if self._protocol is not None:
+            return self._protocol.budget.stats()
+        return {"policy": self._decimation, "received": 0, "processed": 0, "dropped": 0}
+
+
+    async def run(self, output: Callable[[np.ndarray, np.ndarray], None]):
+        # output gets points in painting coordinates with their times
+        if self._worker:
+            await self.run_worker(output)
+        else:
+            async for points, times in self.read_points():
+                output(points, times)
+
+
+    async def run_worker(self, output: Callable[[np.ndarray, np.ndarray], None]):
+        # serial reading and decoding in separate process, points come through shared memory
+
+        ring = self._ring = SharedPointRing(self._ring_size)
+        context = multiprocessing.get_context('spawn')
+        reader, writer = context.Pipe(duplex=False)
+        stop = context.Event()
+        process = context.Process(
+            target=worker.run,
+            args=(self._conf, self._painting, self._index, ring.name, ring.size, writer, stop),
+            name=f"lidar {self._index}",
+            daemon=True
+        )
+        process.start()
+        writer.close()
+        print(f"lidar {self._index} worker started pid: {process.pid}")
+
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+        closed = False
+
+        def wake_up():
+            nonlocal closed
+            try:
+                closed = os.read(reader.fileno(), 65536) == b''
+            except BlockingIOError:
+                ...
+            ready.set()
+
+        os.set_blocking(reader.fileno(), False)
+        loop.add_reader(reader.fileno(), wake_up)
+        try:
+            while not closed:
+                await ready.wait()
+                ready.clear()
+                points, times = ring.read()
+                if len(points):
+                    output(points, times)
+            print(f"lidar {self._index} worker ended")
+
+        except asyncio.CancelledError:
+            print(f"lidar {self._index} canceled")
+
+        finally:
+            loop.remove_reader(reader.fileno())
+            reader.close()
+            stop.set()
+            await loop.run_in_executor(None, process.join, 2)
+            if process.is_alive():
+                process.terminate()
+            if ring.lost:
+                print(f"lidar {self._index} worker points lost: {ring.lost}")
+            self._ring = None
+            ring.close()
+            ring.unlink()
+            print(f"lidar {self._index} closed")
+
+
+class LidarGroup():
+    # all lidars of painting, every one runs its own protocol or worker
+    # batches of all lidars ready in the same loop iteration go to state together, ordered by time
+
+    def __init__(self):
+        self.sensors: list[Lidar] = []
+        self._pending: list[tuple[np.ndarray, np.ndarray]] = []
+        self._tracker = None
+        self._flush_handle: asyncio.TimerHandle | None = None
+
+    def configure(self, conf: models.ConfigFile, conf_painting: models.PaintingFile):
+
+        self._state = state.app_state
+        self.sensors = []
+        for index in range(len(conf_painting.lidars)):
+            sensor = Lidar()
+            sensor.configure(conf, conf_painting, index)
+            self.sensors.append(sensor)
+        self._tracker = None
+        if conf.lidar.tracking:
+            self._tracker = tracking.HandTracker(conf.lidar.tracking_cell, conf.lidar.tracking_lead)
+
+
+    def stats(self) -> dict:
+        sensors = [sensor.stats() for sensor in self.sensors]
+        return {
+            "received": sum(s["received"] for s in sensors),
+            "processed": sum(s["processed"] for s in sensors),
+            "dropped": sum(s["dropped"] for s in sensors),
+            "sensors": sensors,
+        }
+
+
+    async def run(self):
+        await asyncio.gather(*(sensor.run(self.collect) for sensor in self.sensors))
+
+
+    def collect(self, points: np.ndarray, times: np.ndarray):
+        self._pending.append((points, times))
+        if len(self._pending) == 1:
+            asyncio.get_running_loop().call_soon(self.merge)
+
+
+    def merge(self):
+        batches, self._pending = self._pending, []
+        if len(batches) == 1:
+            points, times = batches[0]
+        else:
+            order = np.argsort(np.concatenate([times for _, times in batches]), kind='stable')
+            points = np.concatenate([points for points, _ in batches])[order]
+            times = np.concatenate([times for _, times in batches])[order]
+        self.publish(points, times)
+
+
+    def publish(self, points: np.ndarray, times: np.ndarray):
+        # points in painting coordinates to state, one per hand when tracking
+        # replay publishes empty batches too, they move the time of capture
+        if self._tracker is not None:
+            if len(points):
+                points, times = self._tracker.update(points, times)
+            else:
+                points, times = self._tracker.flush(self._state.clock())
+            self._schedule_flush()
+        if len(points):
+            self._state.add_points(points, times)
+        else:
+            self._state.advance()
+
+
+    def _schedule_flush(self):
+        # hands of finished revolution go to state at its end, not only when next points come
+        if self._flush_handle is not None or not self._tracker.pending:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._flush_handle = loop.call_later(max(0, self._tracker.end - self._state.clock()), self._flush)
+
+
+    def _flush(self):
+        self._flush_handle = None
+        points, times = self._tracker.flush(self._state.clock())
+        if len(points):
+            self._state.add_points(points, times)
+        self._schedule_flush()
 
 
-app_lidar = Lidar()
+app_lidar = LidarGroup()
@@ -0,0 +1,53 @@
+import time
+import numpy as np
+
+from .decoder import ANGLE_UNITS
+
+SCAN_FREQUENCY = 10 # LD19 revolutions per second
+
+
+class BackgroundModel:
+    # distance of static returns (painting frame, wall, fixtures) for every angle bin
+    # lidar can't see behind the nearest static return, so only points closer than it by margin are foreground
+    # learned as minimum over calibration window, then slowly follows mean of background returns (adapt seconds
+    # time constant) - foreground points never move it, otherwise often touched bins would learn the hand
+
+    def __init__(self, max_distance: float, bins: int = 720, margin: float = 50, calibration: float = 3, adapt: float = 60):
+        self.bins = bins
+        self.margin = margin
+        self.calibration = calibration
+        self.adapt = adapt
+        self.range = np.full(bins, float(max_distance)) # max_distance - no static return in bin
+        self.suppressed = 0
+        self._bin = np.arange(ANGLE_UNITS) * bins // ANGLE_UNITS # raw lidar angle -> bin
+        # per point weight, a bin gets about one point per revolution
+        self._rate = 1 / (adapt * SCAN_FREQUENCY) if adapt > 0 else 0
+        self._until = None
+        self._now = 0.0
+
+    @property
+    def calibrating(self) -> bool:
+        return self._until is None or self._now < self._until
+
+    def apply(self, angles: np.ndarray, dist: np.ndarray, t: float | None = None) -> np.ndarray:
+        # angles - raw lidar angles, dist - distances of points, t - their receive time (capture time in replay)
+        # returns bool mask of foreground points, all points are foreground while calibrating
+        bins = self._bin[angles]
+        now = self._now = time.time() if t is None else t
+        if self._until is None:
+            self._until = now + self.calibration
+        if now < self._until:
+            np.minimum.at(self.range, bins, dist)
+            return np.ones(len(dist), dtype=bool)
+
+        foreground = dist < self.range[bins] - self.margin
+        self.suppressed += len(dist) - np.count_nonzero(foreground)
+
+        if self._rate and len(bins):
+            background = ~foreground
+            count = np.bincount(bins[background], minlength=self.bins)
+            seen = np.flatnonzero(count)
+            mean = np.bincount(bins[background], dist[background], minlength=self.bins)[seen] / count[seen]
+            alpha = 1 - (1 - self._rate) ** count[seen]
+            self.range[seen] += alpha * (mean - self.range[seen])
+        return foreground
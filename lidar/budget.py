@@ -0,0 +1,84 @@
+import time
+import numpy as np
+
+POLICIES = ('all', 'drop_oldest', 'spatial')
+RATE_PERIOD = 0.25 # seconds, averaging period of received frame rate
+
+
+class FrameBudget:
+    # decides which frames get decoded so that decoding takes at most `budget` seconds of cpu per second
+    # all - every frame, budget only measured
+    # drop_oldest - frames the saved up time can pay for, newest ones
+    # spatial - evenly spread fraction of frames, points stay spread over the whole scan
+
+    def __init__(self, policy: str = 'spatial', budget: float = 0.5, burst: float = 0.1):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown decimation policy: {policy}")
+        self.policy = policy
+        self.budget = budget # seconds of processing per second
+        self.burst = burst # seconds, time that can be saved up for later
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.cost = 0.0 # seconds per frame, moving average
+        self.rate = 0.0 # received frames per second, moving average
+        self.busy = 0.0 # seconds spent processing
+        self._credit = burst * budget
+        self._phase = 0.0
+        self._last = None
+
+    @property
+    def fraction(self) -> float:
+        # part of received frames the budget can pay for
+        if self.cost * self.rate <= self.budget:
+            return 1.0
+        return self.budget / (self.cost * self.rate)
+
+    def select(self, frames: np.ndarray) -> np.ndarray:
+        now = time.perf_counter()
+        n = len(frames)
+        if self._last is not None:
+            elapsed = now - self._last
+            self._credit = min(self._credit + elapsed * self.budget, self.burst * self.budget)
+            if elapsed > 0:
+                alpha = min(1.0, elapsed / RATE_PERIOD)
+                self.rate += alpha * (n / elapsed - self.rate)
+        self._last = now
+        self.received += n
+
+        if self.policy == 'all' or self.cost == 0:
+            selected = frames
+        elif self.policy == 'drop_oldest':
+            count = min(n, max(0, int(self._credit / self.cost)))
+            selected = frames[n - count:]
+        else:
+            # frame is taken every time the accumulated fraction crosses a whole number
+            # nothing while saved up time is spent, e.g. until frame rate estimate settles
+            acc = self._phase + self.fraction * np.arange(1, n + 1)
+            selected = frames[np.floor(acc) > np.floor(acc - self.fraction)]
+            self._phase = acc[-1] % 1 if n else self._phase
+            if self._credit <= 0:
+                selected = selected[:0]
+        self.dropped += n - len(selected)
+        return selected
+
+    def spent(self, frames: int, seconds: float):
+        # processing time of selected frames
+        if not frames:
+            return
+        self.processed += frames
+        self.busy += seconds
+        self._credit -= seconds
+        alpha = min(1.0, frames / 50)
+        self.cost += alpha * (seconds / frames - self.cost)
+
+    def stats(self) -> dict:
+        return {
+            "policy": self.policy,
+            "received": self.received,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "frame_cost": self.cost,
+            "frame_rate": self.rate,
+            "load": self.cost * self.rate,
+        }
@@ -0,0 +1,138 @@
+from typing import Iterator
+import asyncio
+import mmap
+import struct
+import time
+
+# capture file: magic, start time, then records of (time offset [s], length) + raw serial bytes
+MAGIC = b'LD19CAP1'
+FILE_HEADER = struct.Struct('<8sd')
+RECORD_HEADER = struct.Struct('<dH')
+MAX_RECORD = 0xFFFF
+
+
+class CaptureWriter:
+    def __init__(self, path: str):
+        self._file = open(path, 'wb')
+        self.start_time = time.time()
+        self._file.write(FILE_HEADER.pack(MAGIC, self.start_time))
+
+    def write(self, data: bytes, t: float | None = None):
+        offset = (time.time() if t is None else t) - self.start_time
+        data = memoryview(data)
+        for i in range(0, len(data), MAX_RECORD):
+            chunk = data[i:i + MAX_RECORD]
+            self._file.write(RECORD_HEADER.pack(offset, len(chunk)))
+            self._file.write(chunk)
+
+    def close(self):
+        self._file.close()
+
+
+class CaptureReader:
+    def __init__(self, path: str):
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.start_time = FILE_HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a lidar capture file")
+
+    def __iter__(self) -> Iterator[tuple[float, bytes]]:
+        # (time offset from capture start, data)
+        pos = FILE_HEADER.size
+        end = len(self._map)
+        while pos + RECORD_HEADER.size <= end:
+            offset, length = RECORD_HEADER.unpack_from(self._map, pos)
+            pos += RECORD_HEADER.size
+            yield offset, self._map[pos:pos + length]
+            pos += length
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+class ReplayTransport(asyncio.Transport):
+    # feeds recorded data to protocol the same way serial transport does
+    # speed - 1 real time, 2 twice as fast, ..., 0 or less as fast as possible
+    # get_extra_info('clock') is capture time of data being fed, protocol stamps points with it
+    # real_time() is capture time of this moment at replay speed, it moves between data as well
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, protocol: asyncio.Protocol, path: str, speed: float = 1.0):
+        super().__init__()
+        self._loop = loop
+        self._protocol = protocol
+        self._reader = CaptureReader(path)
+        self._speed = speed
+        self._closing = False
+        self._reading = asyncio.Event()
+        self._reading.set()
+        self.now = self._reader.start_time
+        self._start: float | None = None
+        self.finished = loop.create_future()
+        self._task = loop.create_task(self._replay())
+
+    @property
+    def loop(self):
+        return self._loop
+
+    def time(self) -> float:
+        return self.now
+
+    def real_time(self) -> float:
+        if self._speed <= 0 or self._start is None:
+            return self.now
+        return max(self.now, self._reader.start_time + (self._loop.time() - self._start) * self._speed)
+
+    async def _replay(self):
+        try:
+            self._protocol.connection_made(self)
+            start = self._start = self._loop.time()
+            for offset, data in self._reader:
+                await self._reading.wait()
+                if self._speed > 0:
+                    delay = start + offset / self._speed - self._loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                else:
+                    # consumers get to run after every record, same as in real time
+                    await asyncio.sleep(0)
+                self.now = self._reader.start_time + offset
+                self._protocol.data_received(data)
+            print('lidar replay finished')
+            self._protocol.eof_received()
+        finally:
+            self._reader.close()
+            if not self.finished.done():
+                self.finished.set_result(None)
+
+    def get_extra_info(self, name, default=None):
+        if name == 'clock':
+            return self.time
+        return default
+
+    def is_closing(self):
+        return self._closing
+
+    def close(self):
+        if not self._closing:
+            self._closing = True
+            self._task.cancel()
+            self._loop.call_soon(self._protocol.connection_lost, None)
+
+    def pause_reading(self):
+        self._reading.clear()
+
+    def resume_reading(self):
+        self._reading.set()
+
+    def is_reading(self):
+        return self._reading.is_set()
+
+
+async def create_replay_connection(loop, protocol_factory, path: str, speed: float = 1.0):
+    # drop-in for serial_asyncio.create_serial_connection
+    protocol = protocol_factory()
+    transport = ReplayTransport(loop, protocol, path, speed)
+    return transport, protocol
@@ -0,0 +1,150 @@
+import numpy as np
+
+# LD19 frame layout (see docs/LD19_Development Manual_V2.3.pdf)
+HEADER = 0x54
+VER_LEN = 0x2C
+POINTS_PER_FRAME = VER_LEN & 0x1F
+
+POINT_DTYPE = np.dtype([
+    ('distance', '<u2'),
+    ('intensity', 'u1'),
+])
+
+FRAME_DTYPE = np.dtype([
+    ('header', 'u1'),
+    ('ver_len', 'u1'),
+    ('speed', '<u2'),
+    ('start_angle', '<u2'),
+    ('points', POINT_DTYPE, (POINTS_PER_FRAME,)),
+    ('end_angle', '<u2'),
+    ('timestamp', '<u2'),
+    ('crc8', 'u1'),
+])
+
+
+ANGLE_UNITS = 36000 # LD19 angle is in 0.01 deg
+
+
+class FrameDecoder:
+    def __init__(self, x_min, y_min, x_max, y_max, min_intensity, max_intensity, min_distance, max_distance, angle, resolution):
+        self.x_min = x_min
+        self.y_min = y_min
+        self.x_max = x_max
+        self.y_max = y_max
+        self.min_intensity = min_intensity
+        self.max_intensity = max_intensity
+        self.min_distance = min_distance
+        self.max_distance = max_distance
+        self.angle = angle # 0.01 deg
+        self.resolution = resolution
+        self.last_pos = (0,0)
+        self.last_dist = None
+        self.background = None # background.BackgroundModel, static returns are dropped
+        self._steps = np.arange(POINTS_PER_FRAME)
+
+        # lookup tables indexed by raw lidar angle, corrected by mounting angle
+        theta = np.pi * (np.arange(ANGLE_UNITS) + angle) / 18000
+        self._sin = np.sin(theta)
+        self._cos = np.cos(theta)
+        self._range_min, self._range_max = self._ranges()
+        roi = self._range_min < self._range_max
+        self._roi_count = np.concatenate(([0], np.cumsum(np.tile(roi, 2)))) # roi angles before given angle, two turns
+        self._intensity_ok = (min_intensity < np.arange(256)) & (np.arange(256) < max_intensity)
+
+
+    def _ranges(self) -> tuple[np.ndarray, np.ndarray]:
+        # distance range where ray of every angle is inside area and distance limits, empty when min >= max
+        # slightly wider than area, exact area check is done on points
+        dx = self._sin
+        dy = -self._cos
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x1, x2 = self.x_min / dx, self.x_max / dx
+            y1, y2 = self.y_min / dy, self.y_max / dy
+        near = np.fmax(np.fmax(np.fmin(x1, x2), np.fmin(y1, y2)), 0)
+        far = np.fmin(np.fmax(x1, x2), np.fmax(y1, y2))
+        near = np.maximum(np.nan_to_num(near, nan=0) - 1, self.min_distance)
+        far = np.minimum(np.nan_to_num(far, nan=np.inf) + 1, self.max_distance)
+        return near, far
+
+
+    def decode(self, frames: np.ndarray, t: float | None = None) -> np.ndarray:
+        # frames - structured array with start_angle, points and end_angle fields, t - their receive time
+        # returns (n,2) array of x,y in lidar coordinates
+        if frames.ndim == 0:
+            frames = frames.reshape(1)
+        if len(frames) == 0:
+            return np.empty((0,2))
+
+        dist = frames['points']['distance'].astype(np.int32)
+
+        # glitch filter needs all frames
+        valid = self._glitch_filter(dist)
+
+        # skip frames not reaching region of interest at all
+        start = frames['start_angle'].astype(np.int32) % ANGLE_UNITS
+        span = (frames['end_angle'].astype(np.int32) - start) % ANGLE_UNITS
+        roi = self._roi_count[start + span + 1] > self._roi_count[start]
+        intensity = frames['points']['intensity']
+        if not roi.all():
+            keep = np.flatnonzero(roi)
+            if len(keep) == 0:
+                return np.empty((0,2))
+            start = start[keep]
+            span = span[keep]
+            dist = dist[keep]
+            valid = valid[keep]
+            intensity = intensity[keep]
+
+        # angle of every point, interpolated between frame start and end (rounded)
+        angles = (start[:,None] + (span[:,None] * self._steps * 2 + POINTS_PER_FRAME - 1) // (2 * (POINTS_PER_FRAME - 1))) % ANGLE_UNITS
+
+        # process only points in intensity limit and distance range of region of interest
+        valid &= self._intensity_ok[intensity] & (self._range_min[angles] < dist) & (dist < self._range_max[angles])
+
+        dist = dist[valid]
+        angles = angles[valid]
+        if self.background is not None:
+            foreground = self.background.apply(angles, dist, t)
+            dist = dist[foreground]
+            angles = angles[foreground]
+        y = -dist*self._cos[angles] # marker up
+        x = dist*self._sin[angles]
+
+        # process only points in given area
+        inside = (self.x_min < x) & (x < self.x_max) & (self.y_min < y) & (y < self.y_max)
+        return self._resolution_filter(x[inside], y[inside])
+
+
+    def _glitch_filter(self, dist: np.ndarray) -> np.ndarray:
+        # filter big distance change - usually caused by lidar glitches
+        # rest of the frame is dropped after a glitch, next frame starts without reference distance
+        sequence = np.empty(dist.size + 1)
+        sequence[0] = np.nan if self.last_dist is None else self.last_dist # nan never compares
+        sequence[1:] = dist.ravel()
+        jumps = (np.abs(np.diff(sequence)) >= self.max_distance).reshape(dist.shape)
+        if not jumps.any():
+            self.last_dist = dist[-1,-1]
+            return np.ones(dist.shape, dtype=bool)
+
+        # first point counts only when previous frame ended without glitch - rare, so loop
+        for i in np.flatnonzero(jumps[1:,0]) + 1:
+            if jumps[i-1].any():
+                jumps[i,0] = False
+
+        self.last_dist = None if jumps[-1].any() else dist[-1,-1]
+        return ~np.logical_or.accumulate(jumps, axis=1)
+
+
+    def _resolution_filter(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        # skip points closer than resolution to previously accepted one (np.isclose semantics)
+        keep = np.zeros(len(x), dtype=bool)
+        last_x, last_y = self.last_pos
+        for i, (px, py) in enumerate(zip(x.tolist(), y.tolist())):
+            if (
+                abs(px - last_x) > self.resolution + 1e-5 * abs(last_x)
+                or abs(py - last_y) > self.resolution + 1e-5 * abs(last_y)
+            ):
+                keep[i] = True
+                last_x, last_y = px, py
+        self.last_pos = (last_x, last_y)
+        return np.column_stack((x[keep], y[keep]))
@@ -0,0 +1,107 @@
+from typing import Iterator
+import numpy as np
+
+from .decoder import HEADER, VER_LEN, FRAME_DTYPE
+
+SYNC = bytes([HEADER, VER_LEN])
+FRAME_SIZE = FRAME_DTYPE.itemsize
+
+
+def _crc_table(poly: int = 0x4D) -> np.ndarray:
+    # CRC8 from LD19 development manual, MSB first, init 0
+    table = np.zeros(256, dtype=np.uint8)
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = ((crc << 1) ^ poly) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table[i] = crc
+    return table
+
+
+CRC_TABLE = _crc_table()
+
+# crc with zero init is linear - crc of a frame is xor of crc contributions of each byte position
+_CRC_POSITIONS = np.zeros((FRAME_SIZE - 1, 256), dtype=np.uint8)
+_CRC_POSITIONS[-1] = CRC_TABLE
+for _i in range(FRAME_SIZE - 3, -1, -1):
+    _CRC_POSITIONS[_i] = CRC_TABLE[_CRC_POSITIONS[_i + 1]]
+
+
+def crc8(frames: np.ndarray) -> np.ndarray:
+    # crc of all bytes but the last one for each frame
+    raw = frames.view(np.uint8).reshape(-1, FRAME_SIZE)[:, :-1]
+    return np.bitwise_xor.reduce(_CRC_POSITIONS[np.arange(FRAME_SIZE - 1), raw], axis=1)
+
+
+class FrameSync:
+    def __init__(self, size: int = 4096):
+        self._buffer = bytearray(max(size, 2 * FRAME_SIZE))
+        self._view = memoryview(self._buffer)
+        self._length = 0
+        self._lost = False
+
+        self.frames = 0 # valid frames
+        self.bad_crc = 0 # frames dropped because of wrong checksum
+        self.resyncs = 0 # number of times stream had to be searched for frame header
+        self.skipped = 0 # bytes dropped while searching for frame header
+
+
+    def feed(self, data: bytes) -> Iterator[np.ndarray]:
+        # yields runs of valid frames as views into internal buffer - process them before next feed
+        data = memoryview(data)
+        while len(data):
+            n = min(len(data), len(self._buffer) - self._length)
+            self._view[self._length:self._length + n] = data[:n]
+            self._length += n
+            data = data[n:]
+            yield from self._scan()
+
+
+    def _scan(self) -> Iterator[np.ndarray]:
+        pos = keep = 0
+        end = self._length
+        try:
+            while True:
+                start = self._buffer.find(SYNC, pos, end)
+                if start < 0:
+                    # header may be split between reads
+                    keep = end - 1 if end > pos and self._buffer[end - 1] == HEADER else end
+                    self._skip(keep - pos)
+                    break
+                self._skip(start - pos)
+                keep = start
+
+                count = (end - start) // FRAME_SIZE
+                if count == 0:
+                    break
+
+                frames = np.frombuffer(self._buffer, dtype=FRAME_DTYPE, count=count, offset=start)
+                synced = (frames['header'] == HEADER) & (frames['ver_len'] == VER_LEN)
+                if not synced.all():
+                    frames = frames[:np.argmin(synced)]
+                valid = crc8(frames) == frames['crc8']
+                good = len(frames) if valid.all() else int(np.argmin(valid))
+
+                pos = keep = start + good * FRAME_SIZE
+                if good:
+                    self.frames += good
+                    self._lost = False
+                    yield frames[:good]
+
+                if good < len(frames):
+                    # wrong checksum - header might be a false one, search again from next byte
+                    self.bad_crc += 1
+                    self._skip(1)
+                    pos = keep = pos + 1
+        finally:
+            # move unprocessed tail to the beginning
+            self._length = end - keep
+            self._view[:self._length] = self._view[keep:end]
+
+
+    def _skip(self, count: int):
+        if count > 0:
+            if not self._lost:
+                self.resyncs += 1
+                self._lost = True
+            self.skipped += count
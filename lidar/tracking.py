@@ -0,0 +1,122 @@
+import numpy as np
+
+SCAN_PERIOD = 0.1 # seconds, LD19 revolution
+_KEY = 1 << 32 # cell key = cx * _KEY + cy
+_NEIGHBOURS = (_KEY - 1, _KEY, _KEY + 1, 1) # half of 8-neighbourhood, other half is found from the other cell
+
+
+def cluster(xy: np.ndarray, cell: float, min_points: int = 1) -> np.ndarray:
+    # centroids (k,2) of groups of points connected through neighbouring grid cells of given size
+    # points are hashed to cells, cells are joined with union-find - linear in number of points
+    if len(xy) == 0:
+        return np.empty((0,2))
+    cells = np.floor(xy / cell).astype(np.int64)
+    keys, inverse = np.unique(cells[:,0] * _KEY + cells[:,1], return_inverse=True)
+    index = {key: i for i, key in enumerate(keys.tolist())}
+    parent = list(range(len(keys)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, key in enumerate(keys.tolist()):
+        for offset in _NEIGHBOURS:
+            j = index.get(key + offset)
+            if j is not None:
+                a, b = find(i), find(j)
+                if a != b:
+                    parent[b] = a
+
+    _, labels = np.unique([find(i) for i in range(len(keys))], return_inverse=True)
+    labels = labels[inverse.ravel()]
+    count = np.bincount(labels)
+    centroids = np.column_stack((
+        np.bincount(labels, xy[:,0]) / count,
+        np.bincount(labels, xy[:,1]) / count,
+    ))
+    return centroids[count >= min_points]
+
+
+class HandTracker:
+    # groups points of every revolution into hands and tracks them with constant velocity (alpha-beta) filter
+    # revolutions are fixed windows of SCAN_PERIOD following each other, first one is centered on the first point -
+    # points of a hand come at the same phase every revolution and stay inside the window with some jitter,
+    # update() and flush() return one predicted position per hand seen in finished window, lead seconds ahead
+
+    def __init__(self, cell: float = 50, lead: float = 0.05, min_points: int = 3, gate: float = 150,
+                 max_age: float = 0.3, alpha: float = 0.6, beta: float = 0.3):
+        self.cell = cell
+        self.lead = lead
+        self.min_points = min_points
+        self.gate = gate # mm, max distance of hand from its predicted position
+        self.max_age = max_age # seconds, track without hand is dropped after
+        self.alpha = alpha
+        self.beta = beta
+        self.pos = np.empty((0,2))
+        self.vel = np.empty((0,2)) # mm/s
+        self.seen = np.empty(0) # time of last hand of track
+        self.end: float | None = None # end of current window
+        self._xy: list[np.ndarray] = []
+        self._last = 0.0 # time of newest point in window
+
+    @property
+    def pending(self) -> bool:
+        return bool(self._xy)
+
+    def update(self, xy: np.ndarray, t: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # points with their times in, predicted hand positions with times out (empty until window is complete)
+        hands = self.flush(t[0])
+        if self.end is None:
+            self.end = t[0] + SCAN_PERIOD / 2
+        self._xy.append(xy)
+        self._last = t[-1]
+        return hands
+
+    def flush(self, now: float) -> tuple[np.ndarray, np.ndarray]:
+        # clusters points of window finished before now, also called without new points so hand is not late
+        if self.end is None or now < self.end:
+            return np.empty((0,2)), np.empty(0)
+        xy, self._xy = self._xy, []
+        if now - self.end >= SCAN_PERIOD:
+            # points stopped coming, buffered points are too old to be a hand now, next window starts with next points
+            self.end = None
+            return np.empty((0,2)), np.empty(0)
+        self.end += SCAN_PERIOD
+        if not xy:
+            return np.empty((0,2)), np.empty(0)
+
+        stamp = self._last
+        self._step(cluster(np.concatenate(xy), self.cell, self.min_points), stamp)
+        active = self.seen == stamp
+        return self.pos[active] + self.vel[active] * self.lead, np.full(np.count_nonzero(active), stamp)
+
+    def _step(self, centroids: np.ndarray, now: float):
+        dt = now - self.seen
+        predicted = self.pos + self.vel * dt[:,None]
+
+        # greedy nearest pairs of track and hand within gate
+        matched = np.full(len(self.pos), -1)
+        used = np.zeros(len(centroids), dtype=bool)
+        if len(self.pos) and len(centroids):
+            dist = np.linalg.norm(predicted[:,None] - centroids[None], axis=2)
+            for flat in np.argsort(dist, axis=None):
+                track, hand = divmod(int(flat), len(centroids))
+                if dist[track, hand] > self.gate:
+                    break
+                if matched[track] < 0 and not used[hand]:
+                    matched[track] = hand
+                    used[hand] = True
+
+        tracks = np.flatnonzero(matched >= 0)
+        residual = centroids[matched[tracks]] - predicted[tracks]
+        self.pos[tracks] = predicted[tracks] + self.alpha * residual
+        self.vel[tracks] += self.beta * residual / np.maximum(dt[tracks,None], 1e-3)
+        self.seen[tracks] = now
+
+        keep = now - self.seen <= self.max_age
+        new = centroids[~used]
+        self.pos = np.concatenate((self.pos[keep], new))
+        self.vel = np.concatenate((self.vel[keep], np.zeros_like(new)))
+        self.seen = np.concatenate((self.seen[keep], np.full(len(new), now)))
@@ -0,0 +1,49 @@
+import asyncio
+import os
+
+import models
+from state.shared import SharedPointRing
+
+
+def run(conf: models.ConfigFile, painting: models.PaintingFile, index: int, ring_name: str, ring_size: int, notify, stop):
+    # entry point of lidar worker process
+    # reads and decodes lidar data, decoded points go to shared ring, main process is woken up through notify pipe
+    try:
+        asyncio.run(_run(conf, painting, index, ring_name, ring_size, notify, stop))
+    except KeyboardInterrupt:
+        ...
+
+
+async def _run(conf: models.ConfigFile, painting: models.PaintingFile, index: int, ring_name: str, ring_size: int, notify, stop):
+    from . import Lidar
+
+    ring = SharedPointRing(ring_size, ring_name)
+    os.set_blocking(notify.fileno(), False)
+    lidar = Lidar()
+    lidar.capture_clock = False # main process state runs on real time
+    lidar.configure(conf.model_copy(update={"lidar": conf.lidar.model_copy(update={"worker": False})}), painting, index)
+
+    async def publish():
+        async for points, times in lidar.read_points():
+            if not len(points):
+                continue
+            ring.write(points, times)
+            frames = lidar.stats()
+            ring.counters[:] = (frames["received"], frames["processed"], frames["dropped"])
+            try:
+                os.write(notify.fileno(), b'\0')
+            except BlockingIOError:
+                # main process is behind, it reads everything on next wake up anyway
+                ...
+
+    task = asyncio.create_task(publish())
+    try:
+        while not stop.is_set() and not task.done():
+            await asyncio.sleep(0.1)
+    finally:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            ...
+        ring.close()
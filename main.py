@@ -33,7 +33,7 @@ async def main():
 
     tasks: list[asyncio.Task] = []
 
-    state.app_state.configure(painting)
+    state.app_state.configure(conf, painting)
 
     if conf.enable_lidar:   
         from lidar import app_lidar
@@ -45,7 +45,7 @@ async def main():
         tasks.append(asyncio.create_task(app_display.run()))
     if conf.enable_sound:
         from sound import app_sound
-        app_sound.configure(painting)
+        app_sound.configure(conf, painting)
         tasks.append(asyncio.create_task(app_sound.run()))
     if conf.enable_api:
         from api import app_api
@@ -17,6 +17,18 @@ class Area(BaseModel):
 class AreaState(Area):
     state: bool
 
+
+class AreaChange(BaseModel):
+    area: Area | None
+    previous: Area | None
+    time: float
+
+
+class ParamsChange(BaseModel):
+    areas: dict[str, Area | None] # winning area of every parameter
+    time: float
+    frame_time: float | None = None # lidar time of newest points causing the change
+
     
 class Point(BaseModel):
 
@@ -32,6 +44,7 @@ class Value(BaseModel):
 class Param(BaseModel):
     id: str
     values: list[Value]
+    ramp: float = 0 # seconds, parameter moves to new value linearly
 
 
 class Painting(BaseModel):
@@ -1,8 +1,23 @@
-from typing import Optional
+from typing import Literal, Optional
 from pydantic import BaseModel
 
 class LidarConfig(BaseModel):
-    serial: str
+    # serial, record and replay - single value or list with value for every lidar of painting
+    serial: str | list[str]
+    record: Optional[str | list[str]] = None # capture file to record raw serial data to, numbered for more lidars
+    replay: Optional[str | list[str]] = None # capture file to use instead of serial port
+    replay_speed: float = 1.0 # 0 - as fast as possible
+    worker: bool = False # read and decode lidar data in separate process
+    worker_ring_size: int = 8192 # points buffered between worker and main process
+    decimation: Literal['all', 'drop_oldest', 'spatial'] = 'spatial' # which frames to skip when decoding is over cpu budget
+    cpu_budget: float = 0.5 # seconds of decoding per second
+    background: bool = False # drop static returns (frame, wall, fixtures)
+    background_calibration: float = 3 # seconds of learning background at start, keep scene empty
+    background_adapt: float = 60 # seconds to follow changes of background, 0 - fixed after calibration
+    background_margin: float = 50 # mm, points closer than background by less are dropped
+    tracking: bool = False # one tracked point per hand instead of all points
+    tracking_cell: float = 50 # mm, points in neighbouring cells belong to the same hand
+    tracking_lead: float = 0.05 # seconds, hand position is predicted this far ahead
 
 
 class ApiConfig(BaseModel):
@@ -13,9 +28,35 @@ class DisplayConfig(BaseModel):
     scale: float
     show_paintings: bool = False
     show_points: bool = True    
+    points_fade: float = 0 # seconds until point fades out, 0 - no fading
+    fps: float = 100 # target frame rate
+    min_fps: float = 10 # frame rate can go down to when rendering or lidar needs more cpu
+    headless: bool = False # render offscreen without window, view through api /visualize/display.mjpg
+    headless_fps: float = 5 # target frame rate of headless rendering
+    show_heatmap: bool = False
+    process: bool = False # render in separate process, slow frames never delay lidar and sound
+    assets_cache: Optional[str] = None # directory for images scaled to display size
     show_areas: bool = True 
 
 
+class SoundConfig(BaseModel):
+    backend: Literal['fmod', 'recording'] = 'fmod' # recording - no sound, parameter changes are logged
+    record: Optional[str] = None # json lines file for parameter changes of recording backend
+    tick: float = 0.01 # seconds between sound library updates
+
+
+class StateConfig(BaseModel):
+    points_count: int = 100 # size of points history
+    clean_points_period: float = 1 # seconds until points are considered as invalid (too old)
+    area_sensitivity: int = 2 # minimal number of valid points to activate area
+    tracking_sensitivity: int = 0 # used instead of area_sensitivity with lidar.tracking - one point per hand and revolution
+    area_resolution: float = 1 # mm, cell size of area lookup grid
+    heatmap_cell: float = 10 # mm, cell size of occupancy heatmap
+    heatmap_half_life: float = 3600 # seconds
+    heatmap_file: Optional[str] = None # heatmap is loaded from and periodically saved to
+    heatmap_save_period: float = 60 # seconds
+
+
 class ConfigFile(BaseModel):
 
     enable_display: bool = False
@@ -28,6 +69,8 @@ class ConfigFile(BaseModel):
     lidar: LidarConfig
     api: ApiConfig
     display: DisplayConfig
+    state: StateConfig = StateConfig()
+    sound: SoundConfig = SoundConfig()
 
 
 
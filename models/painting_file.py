@@ -16,6 +16,10 @@ class AreaConfig(BaseModel):
 class PaintingFile(BaseModel):
     
     music: common.MusicConfig    
-    lidar: LidarConfig
+    lidar: LidarConfig | list[LidarConfig]
     area: AreaConfig
-    paintings: list[common.Painting]
\ No newline at end of file
+    paintings: list[common.Painting]
+
+    @property
+    def lidars(self) -> list[LidarConfig]:
+        return self.lidar if isinstance(self.lidar, list) else [self.lidar]
\ No newline at end of file
@@ -1,64 +1,63 @@
-import numpy as np
 import asyncio
-from  models import painting_file
-import os
-import pyfmodex
-import pyfmodex.studio
+import models
 
 import state
 from state import app_state
+from .backend import SoundBackend
+from .engine import SoundEngine
 
 class Sound:
 
     def __init__(self):
-        self._fmod_system = pyfmodex.studio.StudioSystem()
-        self._fmod_instance = None
+        self._backend: SoundBackend | None = None
 
-    def configure(self, config: painting_file.PaintingFile):
+    def configure(self, conf: models.ConfigFile, config: models.PaintingFile):
 
         self._state = app_state
-        bank_file = os.path.join(state.picture_path, config.music.bank_file)
-        bank_strings_file = os.path.join(state.picture_path, config.music.bank_string_file)        
-        self._fmod_system.initialize()
-        self._fmod_system.load_bank_file(bank_file)
-        self._fmod_system.load_bank_file(bank_strings_file)
-        self._fmod_event = self._fmod_system.get_event(f"event:{config.music.fmod_event}")
-        self._fmod_instance = self._fmod_event.create_instance()
-        self._fmod_instance.start()
-        self._fmod_system.update()     
-           
-        
+        if conf.sound.backend == 'recording':
+            from .recording import RecordingBackend
+            self._backend = RecordingBackend(conf.sound.record, lambda: self._state.real_clock())
+        else:
+            # fmod needs its library and bank files, imported only when used
+            from .fmod import FmodBackend
+            self._backend = FmodBackend(state.picture_path, config.music)
+        self._engine = SoundEngine(self._backend, conf.sound.tick)
+        for param in config.music.bank_params:
+            self._engine.add_parameter(param.id, param.ramp)
+
+
     def __del__(self):
-        if self._fmod_instance is not None:
-            self._fmod_instance.stop()
-        self._fmod_system.release() 
+        if self._backend is not None:
+            self._backend.close()
+
+
+    def set_areas(self, areas: dict[str, models.Area | None], frame_time: float | None = None):
+        # parameter without winning area gets its default value, all parameters go to backend in one update
+        values = {}
+        for param_id, area in areas.items():
+            if area is None:
+                area = self._state.get_default_area(param_id)
+            if area is not None:
+                values[param_id] = area.param_value
+        self._engine.set_many(values, frame_time)
 
 
     async def run(self):
+        # backend is updated in sound engine thread, here only parameter changes are passed to it
+        self._engine.start()
         try:
-            while True:
-                if self._state.get_current_area() is not None:
-                    current_area = self._state.get_current_area()
-                elif app_state.get_default_area() is not None:
-                    current_area = self._state.get_default_area()
-                else:
-                    current_area = None
-
-                if current_area is not None:
-                    self._fmod_instance.set_parameter_by_name(
-                        current_area.param_id,
-                        current_area.param_value
-                    )
-                    self._fmod_system.update()                    
-
-                await asyncio.sleep(1)
-                
+            with self._state.params_changes() as changes:
+                self.set_areas(self._state.get_current_areas())
+                async for change in changes:
+                    self.set_areas(change.areas, change.frame_time)
+
         except asyncio.CancelledError:
             print(f"sound canceled")
 
         finally:
-            print(f"sound closed") 
-        
+            self._engine.stop()
+            print(f"sound closed")
+
 
 
-app_sound = Sound()            
\ No newline at end of file
+app_sound = Sound()
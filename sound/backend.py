@@ -0,0 +1,22 @@
+from abc import abstractmethod
+
+
+class SoundBackend:
+    # sound library driven by sound engine, all calls after construction come from sound thread
+    # frame_time is lidar time of points which caused the change, None for changes without lidar cause
+
+    @abstractmethod
+    def parameter(self, name: str):
+        # handle of parameter used by set_parameter, looked up once
+        ...
+
+    @abstractmethod
+    def set_parameter(self, parameter, value: float, frame_time: float | None = None):
+        ...
+
+    @abstractmethod
+    def update(self):
+        ...
+
+    def close(self):
+        ...
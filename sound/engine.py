@@ -0,0 +1,107 @@
+import threading
+import time
+
+from .backend import SoundBackend
+
+
+class SoundEngine:
+    # all backend calls after initialization happen in one thread - parameter writes and regular update() on fixed tick
+    # set() only stores requested value and wakes the thread up, values are written only when they change
+    # parameter with ramp moves linearly to new value over ramp seconds
+
+    def __init__(self, backend: SoundBackend, tick: float = 0.01):
+        self._backend = backend
+        self.tick = tick
+        self._handles = {} # parameter name -> backend handle, looked up once
+        self._ramps: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._targets: dict[str, float] = {} # requested values, shared with event loop
+        self._frame_times: dict[str, float] = {} # lidar time of requested values not written yet
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+        # sound thread only
+        self._values: dict[str, float] = {} # written to backend
+        self._ramping: dict[str, tuple[float, float, float]] = {} # start value, target, start time
+
+    def add_parameter(self, name: str, ramp: float = 0):
+        self._handles[name] = self._backend.parameter(name)
+        self._ramps[name] = ramp
+
+    def set(self, name: str, value: float, frame_time: float | None = None):
+        self.set_many({name: value}, frame_time)
+
+    def set_many(self, values: dict[str, float], frame_time: float | None = None):
+        # all values are written before the same update()
+        with self._lock:
+            changed = {name: value for name, value in values.items() if self._targets.get(name) != value}
+            if not changed:
+                return
+            self._targets.update(changed)
+            for name in changed:
+                if frame_time is not None:
+                    self._frame_times[name] = frame_time
+                else:
+                    self._frame_times.pop(name, None)
+        self._wake.set()
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sound", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        next_update = time.monotonic()
+        while not self._stop.is_set():
+            self._wake.wait(max(0, next_update - time.monotonic()))
+            self._wake.clear()
+            now = time.monotonic()
+            with self._lock:
+                targets = list(self._targets.items())
+                frame_times = dict(self._frame_times)
+
+            changed = False
+            traced = [] # lidar times used up - written, or nothing to write towards target
+            for name, target in targets:
+                value = self._value(name, target, now)
+                if value != self._values.get(name):
+                    # first write towards new target carries lidar time for latency tracing
+                    self._backend.set_parameter(self._handles[name], value, frame_times.get(name))
+                    self._values[name] = value
+                    changed = True
+                    traced.append(name)
+                elif value == target:
+                    traced.append(name)
+
+            if frame_times and traced:
+                with self._lock:
+                    for name in traced:
+                        # newer set() since copy keeps its own time
+                        if name in frame_times and self._frame_times.get(name) == frame_times[name]:
+                            del self._frame_times[name]
+
+            if changed or now >= next_update:
+                self._backend.update()
+                next_update = now + self.tick
+
+    def _value(self, name: str, target: float, now: float) -> float:
+        ramp = self._ramps.get(name, 0)
+        current = self._values.get(name)
+        if ramp <= 0 or current is None:
+            return target
+        start, ramp_target, start_time = self._ramping.get(name, (current, current, now))
+        if ramp_target != target:
+            start, start_time = current, now
+            self._ramping[name] = (start, target, start_time)
+        progress = min(1.0, (now - start_time) / ramp)
+        if progress >= 1:
+            self._ramping.pop(name, None)
+        return start + (target - start) * progress
@@ -0,0 +1,34 @@
+import os
+import pyfmodex
+import pyfmodex.studio
+
+import models
+from .backend import SoundBackend
+
+
+class FmodBackend(SoundBackend):
+
+    def __init__(self, picture_path: str, music: models.MusicConfig):
+        self._system = pyfmodex.studio.StudioSystem()
+        self._system.initialize()
+        self._system.load_bank_file(os.path.join(picture_path, music.bank_file))
+        self._system.load_bank_file(os.path.join(picture_path, music.bank_string_file))
+        self._event = self._system.get_event(f"event:{music.fmod_event}")
+        self._instance = self._event.create_instance()
+        self._instance.start()
+        self._system.update()
+
+    def parameter(self, name: str):
+        return self._event.get_parameter_description_by_name(name).id
+
+    def set_parameter(self, parameter, value: float, frame_time: float | None = None):
+        self._instance.set_parameter_by_id(parameter, value)
+
+    def update(self):
+        self._system.update()
+
+    def close(self):
+        if self._instance is not None:
+            self._instance.stop()
+            self._instance = None
+            self._system.release()
@@ -0,0 +1,31 @@
+# python -m sound.latency sound.jsonl [...]
+# touch to sound latency from parameter changes recorded by recording sound backend,
+# e.g. with lidar.replay of a capture and sound.backend: recording, latency is real only at replay_speed 1
+import argparse
+import numpy as np
+
+from . import recording
+
+
+def report(latencies: np.ndarray) -> dict:
+    if not len(latencies):
+        return {"count": 0}
+    p50, p99 = np.percentile(latencies, (50, 99)) * 1e3
+    return {"count": len(latencies), "p50": p50, "p99": p99, "max": latencies.max() * 1e3}
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m sound.latency")
+    parser.add_argument("records", nargs="+", help="json lines files written by recording sound backend")
+    args = parser.parse_args()
+
+    for path in args.records:
+        res = report(recording.latencies(recording.load(path)))
+        if not res["count"]:
+            print(f"{path}: no parameter changes caused by lidar points")
+            continue
+        print(f"{path}: {res['count']} changes, p50 {res['p50']:.2f} ms, p99 {res['p99']:.2f} ms, max {res['max']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
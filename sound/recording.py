@@ -0,0 +1,45 @@
+from typing import Callable
+import json
+import time
+import numpy as np
+
+from .backend import SoundBackend
+
+
+class RecordingBackend(SoundBackend):
+    # stand-in for sound library, parameter changes are kept with their times and appended to json lines file
+    # {"time": ..., "param": ..., "value": ..., "frame_time": ...}
+    # clock - time of records on the scale of frame times, in replay capture time at replay speed
+
+    def __init__(self, path: str | None = None, clock: Callable[[], float] = time.time):
+        self.records: list[dict] = []
+        self.clock = clock
+        self._file = open(path, 'a') if path is not None else None
+
+    def parameter(self, name: str):
+        return name
+
+    def set_parameter(self, parameter, value: float, frame_time: float | None = None):
+        record = {"time": self.clock(), "param": parameter, "value": value, "frame_time": frame_time}
+        self.records.append(record)
+        if self._file is not None:
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+
+    def update(self):
+        ...
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def load(path: str) -> list[dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def latencies(records: list[dict]) -> np.ndarray:
+    # seconds from lidar frame to parameter set, only changes caused by lidar points
+    return np.array([r["time"] - r["frame_time"] for r in records if r["frame_time"] is not None], dtype=float)
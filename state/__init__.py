@@ -1,9 +1,13 @@
-from typing import Iterator
+from typing import Callable, Iterator
 import asyncio
 import pydantic
 import time
 import models
 import numpy as np
+from .points import PointRing, PointsView
+from .areas import AreaIndex
+from .events import AreaSubscription, ParamsSubscription
+from .heatmap import Heatmap
 
 app_path = ""
 picture_conf = ""
@@ -11,104 +15,243 @@ picture_path = ""
 
 points_count = 100
 clean_points_period = 1 # seconds until points are considered as invalid (too old)
-validation_period = 1 # seconde until area is considered as invalid and have to be recalculated
 area_sensitivity = 2 # minimal number of valid points to activate area
+expiry_resolution = 0.01 # seconds, minimal interval of checking area changes caused by old points
 
 class State:
 
 
     def __init__(self):
 
-        self._points_count = points_count # fix by now
-        self._points_index = 0        
+        self._points_count = points_count
         self._current_area: models.Area | None = None
-        self._validation_time: float | None = time.time()
         self._clean_points_period: float = clean_points_period
-        self._validation_period: float = validation_period
 
         self._areas_limits: np.ndarray = np.zeros((0,4))
         self._areas_sizes: np.ndarray = np.zeros((0,1))
         self._areas: list[models.Area] = [] 
+        # areas are grouped by parameter, _params_starts[i] is index of first area of parameter _params[i]
+        # densities are scattered to row per parameter (padded with -1), winners of parameters are argmax of rows
+        self._params: list[str] = []
+        self._params_starts: np.ndarray = np.zeros(0, dtype=np.intp)
+        self._params_density: np.ndarray = np.zeros((0,0))
+        self._params_cells: np.ndarray = np.zeros(0, dtype=np.intp)
+        self._params_winners: np.ndarray = np.zeros(0, dtype=np.intp) # area index for every parameter, -1 if none
+        self._areas_index = AreaIndex(self._areas_limits, 0, 0)
         self._area_sensitivity = area_sensitivity
 
-        # filling up points
-        self._points: list[models.Point] = []
-        self._points_times: np.array = np.zeros(self._points_count)
-        # self._points_array: np.array = np.zeros((0,2))
-        for i in range(self._points_count):
-            self._points.append(models.Point(pos=(0,0), color=(0,0,0)))
-            # self._points_array = np.vstack([
-            #     self._points_array,
-            #     [0,0]
-            # ])
-            
-        self._points_areas = None
-
-
-    def configure(self, painting_conf: models.PaintingFile):
-
-        # filling up areas                    
-        for param in painting_conf.music.bank_params: 
-            for value in param.values:
-                area = models.Area(
-                    param_id = param.id,
-                    param_value = value.value,
-                    rect = value.rect
-                )
-                self._areas.append(area)
-
-                self._areas_limits = np.vstack([
-                    self._areas_limits,
-                    [
-                        value.rect.x,
-                        value.rect.y,
-                        value.rect.x + value.rect.w,
-                        value.rect.y + value.rect.h,
-                    ]
-                ])
-
-                self._areas_sizes = np.vstack([
-                    self._areas_sizes,
-                    [value.rect.w * value.rect.h]
-                ])                
-        self._points_areas = np.ones((len(self._points), len(self._areas)), dtype=bool)
+        self._points = PointRing(self._points_count, 0)
+        # number of valid points in every area, points before _points_expired are already subtracted
+        self._areas_counts: np.ndarray = np.zeros(0, dtype=int)
+        self._points_expired = 0
+
+        self._subscribers: list[AreaSubscription] = []
+        self._params_subscribers: list[ParamsSubscription] = []
+        self._expiry_handle: asyncio.TimerHandle | None = None
+        self._heatmap: Heatmap | None = None
+        self._points_listeners: list[Callable[[np.ndarray, np.ndarray], None]] = []
+        # time of points and area changes, replay sets clock of capture
+        # real_clock is on the same scale, in replay it moves also between data (clock only with data)
+        self.clock: Callable[[], float] = time.time
+        self.real_clock: Callable[[], float] = time.time
+
+
+    def configure(self, conf: models.ConfigFile, painting_conf: models.PaintingFile):
+
+        self._points_count = conf.state.points_count
+        self._clean_points_period = conf.state.clean_points_period
+        self._area_sensitivity = conf.state.tracking_sensitivity if conf.lidar.tracking else conf.state.area_sensitivity
+
+        # filling up areas
+        self._areas = [
+            models.Area(
+                param_id = param.id,
+                param_value = value.value,
+                rect = value.rect
+            )
+            for param in painting_conf.music.bank_params
+            for value in param.values
+        ]
+        params = [param for param in painting_conf.music.bank_params if param.values]
+        self._params = [param.id for param in params]
+        lengths = [len(param.values) for param in params]
+        self._params_starts = np.cumsum([0] + lengths[:-1], dtype=np.intp)
+        self._params_density = np.full((len(params), max(lengths, default=0)), -1.0)
+        self._params_cells = np.concatenate(
+            [np.arange(length) + i * self._params_density.shape[1] for i, length in enumerate(lengths)]
+        ).astype(np.intp) if params else np.zeros(0, dtype=np.intp)
+        self._params_winners = np.full(len(params), -1, dtype=np.intp)
+        self._areas_limits = np.array(
+            [[a.rect.x, a.rect.y, a.rect.x + a.rect.w, a.rect.y + a.rect.h] for a in self._areas],
+            dtype=float
+        ).reshape(-1, 4)
+        self._areas_sizes = np.array([[a.rect.w * a.rect.h for a in self._areas]], dtype=float).T
+        self._areas_index = AreaIndex(
+            self._areas_limits,
+            painting_conf.area.w,
+            painting_conf.area.h,
+            conf.state.area_resolution
+        )
+        self._points = PointRing(self._points_count, len(self._areas))
+        self._areas_counts = np.zeros(len(self._areas), dtype=int)
+        self._points_expired = 0
+        self._heatmap = Heatmap(
+            painting_conf.area.w,
+            painting_conf.area.h,
+            conf.state.heatmap_cell,
+            conf.state.heatmap_half_life,
+            conf.state.heatmap_file,
+            conf.state.heatmap_save_period
+        )
 
 
     def get_current_area(self) -> models.Area | None:
-    
+        self._update_current_area(self.clock())
+        return self._current_area
+
+
+    def get_current_areas(self) -> dict[str, models.Area | None]:
+        # winning area of every parameter
+        self._update_current_area(self.clock())
+        self._update_params_winners()
+        return self._winners_areas()
+
+
+    def area_changes(self) -> AreaSubscription:
+        # current area changes as async iterator, use as context manager to unsubscribe
+        return AreaSubscription(self._subscribers)
 
-        if self._validation_time is None or self._validation_time + self._validation_period < time.time():                
 
-            self._validation_time = time.time()
+    def params_changes(self) -> ParamsSubscription:
+        # changes of winning areas of parameters, same usage as area_changes
+        return ParamsSubscription(self._params_subscribers)
 
-            # print(f"{np.max(self._points_times)-np.min(self._points_times)}\t{time.time() - np.min(self._points_times)}")
 
-            # filter out old point
-            points_areas = self._points_areas[self._points_times + self._clean_points_period > time.time(), :]                       
+    def add_points_listener(self, listener: Callable[[np.ndarray, np.ndarray], None]):
+        # listener gets every batch of added points with their times
+        self._points_listeners.append(listener)
 
-            # calculate current area if needed
-            areas_count = np.sum(points_areas,0)
-            # print(areas_count)
-            area_index = np.argmax(areas_count.T / self._areas_sizes.T) 
-            if areas_count[area_index] > self._area_sensitivity:
+
+    def remove_points_listener(self, listener: Callable[[np.ndarray, np.ndarray], None]):
+        if listener in self._points_listeners:
+            self._points_listeners.remove(listener)
+
+
+    def _update_current_area(self, now: float, frame_time: float | None = None):
+
+        self._expire_points(now)
+
+        previous = self._current_area
+        if len(self._areas):
+            # current area is the overall winner - first area with the highest density
+            self._params_density.flat[self._params_cells] = self._areas_counts / self._areas_sizes[:,0]
+            param_index, column = divmod(int(self._params_density.argmax()), self._params_density.shape[1])
+            area_index = self._params_starts[param_index] + column
+            if self._areas_counts[area_index] > self._area_sensitivity:
                 self._current_area = self._areas[area_index]
             else:
                 self._current_area = None
 
-        return self._current_area
-    
-
-    def get_default_area(self) -> models.Area | None:
+        if self._subscribers or self._params_subscribers:
+            if self._current_area is not previous:
+                change = models.AreaChange(area=self._current_area, previous=previous, time=now)
+                for subscriber in self._subscribers:
+                    subscriber.publish(change)
+            if self._params_subscribers:
+                previous_winners = self._params_winners
+                self._update_params_winners()
+                if not np.array_equal(self._params_winners, previous_winners):
+                    params_change = models.ParamsChange(areas=self._winners_areas(), time=now, frame_time=frame_time)
+                    for params_subscriber in self._params_subscribers:
+                        params_subscriber.publish(params_change)
+            self._schedule_expiry(now)
+
+
+    def _update_params_winners(self):
+        # winner of every parameter - first area with the highest density in parameter row, densities are
+        # from last _update_current_area
+        if len(self._areas):
+            winners = self._params_density.argmax(1) + self._params_starts
+            self._params_winners = np.where(self._areas_counts[winners] > self._area_sensitivity, winners, -1)
+
+
+    def _winners_areas(self) -> dict[str, models.Area | None]:
+        return {
+            param_id: self._areas[winner] if winner >= 0 else None
+            for param_id, winner in zip(self._params, self._params_winners.tolist())
+        }
+
+
+    def _schedule_expiry(self, now: float):
+        # area may change when points get too old even if no new points come
+        if self._expiry_handle is not None or self._points_expired >= self._points.count:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        oldest = self._points.between(self._points_expired, self._points_expired + 1).t[0]
+        delay = max(oldest + self._clean_points_period - now, expiry_resolution)
+        self._expiry_handle = loop.call_later(delay, self._on_expiry)
+
+
+    def advance(self):
+        # clock moved without new points, changes caused by points getting too old are published now
+        # (replay faster than real time does not wait for expiry timer)
+        if not (self._subscribers or self._params_subscribers) or self._points_expired >= self._points.count:
+            return
+        oldest = self._points.between(self._points_expired, self._points_expired + 1).t[0]
+        now = self.clock()
+        if oldest + self._clean_points_period <= now:
+            self._update_current_area(now)
+
+
+    def _on_expiry(self):
+        self._expiry_handle = None
+        self._update_current_area(self.clock())
+
+
+    def _expire_points(self, now: float):
+        # remove too old points from areas counts
+        points = self._points.between(self._points_expired, self._points.count)
+        expired = np.searchsorted(points.t, now - self._clean_points_period, side='right')
+        if expired:
+            self._areas_counts -= points.areas[:expired].sum(0)
+            self._points_expired += expired
+
+
+    def get_default_area(self, param_id: str | None = None) -> models.Area | None:
+        # first area, or first area of the parameter if given
+        if param_id is not None:
+            if param_id not in self._params:
+                return None
+            return self._areas[self._params_starts[self._params.index(param_id)]]
         if len(self._areas) > 0:
             return self._areas[0]
         else:
             return None
 
 
-    def get_points(self) -> list[models.Point] :
-        return self._points
+    def get_points_view(self, period: float | None = None) -> PointsView:
+        # arrays of stored points (views - valid until next add), only points newer than period seconds if given
+        if period is None:
+            return self._points.last()
+        return self._points.since(self.clock() - period)
+
+
+    def get_points(self, period: float | None = None) -> list[models.Point] :
+        view = self.get_points_view(period)
+        return [
+            models.Point(pos=pos, color=color)
+            for pos, color in zip(view.xy.tolist(), view.color.tolist())
+        ]
     
 
+    def get_heatmap(self) -> Heatmap | None:
+        # long term occupancy of painting area
+        return self._heatmap
+
+
     def get_areas_states(self) -> list[models.AreaState]:
         current = self.get_current_area()
         return [
@@ -118,25 +261,41 @@ class State:
 
 
     def add_point(self, pos: tuple[float, float], color: tuple[int, int, int] = (255,255,255)):
+        self.add_points(np.array([pos], dtype=float), color=color)
+
+
+    def add_points(self, xy: np.ndarray, t: float | np.ndarray | None = None, color: tuple[int, int, int] = (255,255,255)):
+
+        if len(xy) == 0:
+            return
+
+        xy = np.asarray(xy, dtype=float)
+        now = self.clock()
+        t = now if t is None else t
 
-        if self._points_areas is not None:
-            self._points_index += 1
-            if self._points_index == self._points_count:
-                self._points_index = 0
+        # find areas the points belong to
+        areas = self._areas_index.classify(xy)
 
-            # points for display        
-            self._points[self._points_index] = models.Point(pos=pos, color=color) 
+        # points overwritten in ring are not valid anymore
+        count = self._points.count
+        overwritten = min(count, count + len(xy) - self._points.size)
+        if overwritten > self._points_expired:
+            self._areas_counts -= self._points.between(self._points_expired, overwritten).areas.sum(0)
+            self._points_expired = overwritten
 
-            # point times for filter
-            self._points_times[self._points_index] = time.time()
+        self._points.write(xy, t, color, areas)
+        self._areas_counts += areas[-self._points.size:].sum(0)
+        self._points_expired = max(self._points_expired, self._points.count - self._points.size)
 
-            # find areas the point belong to
-            p = pos
-            a = self._areas_limits
-            self._points_areas[self._points_index] = (a[:,0] < p[0]) & (p[0] < a[:,2]) & (a[:,1] < p[1]) & (p[1] < a[:,3])
+        # side effects only after points are counted
+        if self._heatmap is not None:
+            self._heatmap.add(xy, now)
+        for listener in self._points_listeners:
+            listener(xy, np.broadcast_to(t, len(xy)))
 
-            # invalidate current area for lazy calculation
-            self._validation_time = None
+        # notify about changes right away, otherwise area is calculated when asked for
+        if self._subscribers or self._params_subscribers:
+            self._update_current_area(now, float(np.max(t)))
 
 
 app_state = State()
@@ -0,0 +1,55 @@
+import math as m
+import numpy as np
+
+
+class AreaIndex:
+    # raster of area combinations over painting, point -> areas is a single gather
+    # grid cell holds label of set of areas covering the cell center, label_masks[label] is the set as bool row
+    # one empty cell border around painting, points outside painting are clipped to it
+
+    def __init__(self, limits: np.ndarray, width: float, height: float, resolution: float = 1):
+        # limits - (n,4) x_min, y_min, x_max, y_max of areas
+        self.resolution = resolution
+        areas_count = len(limits)
+        if areas_count:
+            width = max(width, limits[:,2].max())
+            height = max(height, limits[:,3].max())
+        cols = m.ceil(width / resolution) + 2
+        rows = m.ceil(height / resolution) + 2
+
+        # cell ranges of areas (+1 for border), cell is inside when its center is
+        cells = np.ceil(np.asarray(limits, dtype=float) / resolution - 0.5).astype(int) + 1
+        cells[:,0::2] = np.clip(cells[:,0::2], 1, cols - 1)
+        cells[:,1::2] = np.clip(cells[:,1::2], 1, rows - 1)
+
+        # compressed grid - only between area edges, expanded to full raster at the end
+        xs = np.unique(np.concatenate(([0, cols], cells[:,0], cells[:,2])))
+        ys = np.unique(np.concatenate(([0, rows], cells[:,1], cells[:,3])))
+        words = max(1, m.ceil(areas_count / 64))
+        bits = np.zeros((len(ys) - 1, len(xs) - 1, words), dtype=np.uint64)
+        for i, (x0, y0, x1, y1) in enumerate(cells):
+            c0, c1 = np.searchsorted(xs, (x0, x1))
+            r0, r1 = np.searchsorted(ys, (y0, y1))
+            bits[r0:r1, c0:c1, i // 64] |= np.uint64(1 << (i % 64))
+
+        self.bits, labels = np.unique(bits.reshape(-1, words), axis=0, return_inverse=True)
+        labels = labels.reshape(bits.shape[:2]).astype(np.min_scalar_type(len(self.bits)))
+        self.grid = np.repeat(np.repeat(labels, np.diff(ys), axis=0), np.diff(xs), axis=1)
+
+        self._scale = 1 / resolution
+        self._max = np.array([cols - 1, rows - 1])
+        self._cols = cols
+        self._flat = self.grid.ravel()
+
+        index = np.arange(areas_count)
+        self.label_masks = ((self.bits[:, index // 64] >> (index % 64).astype(np.uint64)) & np.uint64(1)).astype(bool)
+
+    def labels(self, xy: np.ndarray) -> np.ndarray:
+        # +1 before truncation - negative values end up in border as well
+        cells = (xy * self._scale + 1).astype(np.intp)
+        np.clip(cells, 0, self._max, out=cells)
+        return self._flat[cells[:,1] * self._cols + cells[:,0]]
+
+    def classify(self, xy: np.ndarray) -> np.ndarray:
+        # (n,2) points -> (n,areas) bool
+        return self.label_masks[self.labels(xy)]
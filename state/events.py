@@ -0,0 +1,58 @@
+import asyncio
+import models
+
+
+class AreaSubscription:
+    # area changes for a single consumer, changes not yet read are merged - slow consumer gets only the latest state
+    #
+    # with app_state.area_changes() as changes:
+    #     async for change in changes:
+    #         ...
+
+    def __init__(self, subscribers: list['AreaSubscription']):
+        self._subscribers = subscribers
+        self._subscribers.append(self)
+        self._pending: models.AreaChange | None = None
+        self._ready = asyncio.Event()
+
+    def publish(self, change: models.AreaChange):
+        if self._pending is not None:
+            change = change.model_copy(update={"previous": self._pending.previous})
+        if change.area is change.previous:
+            # changed back before it was read
+            self._pending = None
+            self._ready.clear()
+        else:
+            self._pending = change
+            self._ready.set()
+
+    async def get(self) -> models.AreaChange:
+        # safe to cancel, e.g. with asyncio.wait_for
+        await self._ready.wait()
+        self._ready.clear()
+        change, self._pending = self._pending, None
+        return change
+
+    def close(self):
+        if self in self._subscribers:
+            self._subscribers.remove(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> models.AreaChange:
+        return await self.get()
+
+
+class ParamsSubscription(AreaSubscription):
+    # winning areas of parameters for a single consumer, only the latest state is kept
+
+    def publish(self, change: models.ParamsChange):
+        self._pending = change
+        self._ready.set()
@@ -0,0 +1,117 @@
+import asyncio
+import io
+import math as m
+import os
+import struct
+import time
+import zlib
+import numpy as np
+
+MAX_WEIGHT = 1e30 # stored values are rescaled before weights get out of float range
+
+
+class Heatmap:
+    # occupancy grid of points over painting area with exponential decay
+    # points are added with weight growing in time (exp(t/tau)) instead of decaying whole grid on every add,
+    # grid is scaled back to current time only when read
+    # periodic saving runs in thread pool with a snapshot of the grid, failed save is only logged
+
+    def __init__(self, width: float, height: float, cell: float = 10, half_life: float = 3600,
+                 path: str | None = None, save_period: float = 60):
+        self.cell = cell
+        self.cols = m.ceil(width / cell)
+        self.rows = m.ceil(height / cell)
+        self.tau = half_life / m.log(2)
+        self.path = path
+        self.save_period = save_period
+        self._grid = np.zeros((self.rows, self.cols))
+        self._flat = self._grid.ravel()
+        self._t0 = time.time() # time of weight 1
+        self._saved = self._t0
+        self._saving = False
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def add(self, xy: np.ndarray, t: float):
+        cells = (xy / self.cell).astype(np.intp)
+        inside = (xy[:,0] >= 0) & (xy[:,1] >= 0) & (cells[:,0] < self.cols) & (cells[:,1] < self.rows)
+        weight = m.exp((t - self._t0) / self.tau)
+        if weight > MAX_WEIGHT:
+            self._rebase(t)
+            weight = 1.0
+        np.add.at(self._flat, cells[inside,1] * self.cols + cells[inside,0], weight)
+        if self.path is not None and t - self._saved >= self.save_period and not self._saving:
+            self._save_later(t)
+
+    def _save_later(self, t: float):
+        self._saved = t
+        grid = self.values(t)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._write(self.path, grid, t)
+            return
+        self._saving = True
+        loop.run_in_executor(None, self._write, self.path, grid, t).add_done_callback(self._saved_later)
+
+    def _saved_later(self, _future: asyncio.Future):
+        self._saving = False
+
+    def _rebase(self, t: float):
+        self._grid *= m.exp((self._t0 - t) / self.tau)
+        self._t0 = t
+
+    def values(self, t: float | None = None) -> np.ndarray:
+        # (rows, cols) decayed number of points in every cell
+        t = time.time() if t is None else t
+        return self._grid * m.exp((self._t0 - t) / self.tau)
+
+    def save(self, path: str, t: float | None = None):
+        t = time.time() if t is None else t
+        self._write(path, self.values(t), t)
+        self._saved = t
+
+    def _write(self, path: str, grid: np.ndarray, t: float):
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp = f"{path}.tmp"
+            with open(tmp, 'wb') as f:
+                np.savez_compressed(f, grid=grid, time=t, cell=self.cell)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"heatmap {path} not saved: {e}")
+
+    def load(self, path: str):
+        with np.load(path) as data:
+            if data['grid'].shape != self._grid.shape or float(data['cell']) != self.cell:
+                print(f"heatmap {path} does not match painting area, starting empty")
+                return
+            self._grid[:] = data['grid']
+            self._t0 = float(data['time'])
+
+    def npy(self) -> bytes:
+        data = io.BytesIO()
+        np.save(data, self.values().astype(np.float32))
+        return data.getvalue()
+
+    def image(self) -> np.ndarray:
+        # (rows, cols) uint8, linear to the busiest cell
+        values = self.values()
+        top = values.max()
+        if top <= 0:
+            return np.zeros(values.shape, dtype=np.uint8)
+        return (values * (255 / top)).astype(np.uint8)
+
+    def png(self) -> bytes:
+        # 8 bit grayscale png
+        def chunk(kind: bytes, data: bytes) -> bytes:
+            return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+        image = self.image()
+        rows = np.column_stack((np.zeros(self.rows, dtype=np.uint8), image)) # filter type 0 for every row
+        return b''.join((
+            b'\x89PNG\r\n\x1a\n',
+            chunk(b'IHDR', struct.pack('>IIBBBBB', self.cols, self.rows, 8, 0, 0, 0, 0)),
+            chunk(b'IDAT', zlib.compress(rows.tobytes(), 6)),
+            chunk(b'IEND', b''),
+        ))
@@ -0,0 +1,75 @@
+from typing import NamedTuple
+import numpy as np
+
+
+class PointsView(NamedTuple):
+    xy: np.ndarray # (n,2) float
+    t: np.ndarray # (n,) time of point
+    color: np.ndarray # (n,3) uint8
+    areas: np.ndarray # (n,areas) bool - areas the point belongs to
+
+
+def mirror_slices(start: int, n: int, size: int) -> list[tuple[slice, slice]]:
+    # (destination, source) slices to write n items at start of ring stored twice (i and i+size)
+    mirror = start + size
+    fits = min(n, 2 * size - mirror)
+    slices = [(slice(start, start + n), slice(0, n)), (slice(mirror, mirror + fits), slice(0, fits))]
+    if fits < n:
+        slices.append((slice(0, n - fits), slice(fits, n)))
+    return slices
+
+
+class PointRing:
+    # struct of arrays ring buffer of points
+    # every point is stored twice (i and i+size), so last n points are always one contiguous slice - views never copy
+
+    def __init__(self, size: int, areas_count: int):
+        self.size = size
+        self.count = 0 # points written so far
+        self.xy = np.zeros((2 * size, 2))
+        self.t = np.full(2 * size, -np.inf)
+        self.color = np.zeros((2 * size, 3), dtype=np.uint8)
+        self.areas = np.zeros((2 * size, areas_count), dtype=bool)
+
+    @property
+    def head(self) -> int:
+        # slot of next point
+        return self.count % self.size
+
+    def write(self, xy: np.ndarray, t: np.ndarray | float, color, areas: np.ndarray):
+        # t, color and areas - per point arrays or values shared by all points
+        # only last size points are kept
+        skip = max(0, len(xy) - self.size)
+        self.count += skip
+        n = len(xy) - skip
+        targets = mirror_slices(self.head, n, self.size)
+
+        for arr, data in ((self.xy, xy), (self.t, t), (self.color, color), (self.areas, areas)):
+            data = np.asarray(data)
+            if data.ndim == arr.ndim:
+                data = data[skip:]
+                for dst, src in targets:
+                    arr[dst] = data[src]
+            else:
+                for dst, _ in targets:
+                    arr[dst] = data
+        self.count += n
+
+    def last(self, n: int | None = None) -> PointsView:
+        # last n points, oldest first
+        n = self.size if n is None else n
+        return self.between(self.count - n, self.count)
+
+    def between(self, start: int, end: int) -> PointsView:
+        # points start..end-1 by write order, only last size points are available
+        start = max(start, self.count - self.size, 0)
+        end = max(start, end)
+        base = self.head + self.size - self.count
+        s = slice(base + start, base + end)
+        return PointsView(self.xy[s], self.t[s], self.color[s], self.areas[s])
+
+    def since(self, t: float) -> PointsView:
+        # points newer than t, expects points written in time order
+        view = self.last()
+        start = np.searchsorted(view.t, t, side='right')
+        return PointsView(*(arr[start:] for arr in view))
@@ -0,0 +1,65 @@
+from multiprocessing import shared_memory
+import numpy as np
+
+from .points import mirror_slices
+
+
+class SharedPointRing:
+    # ring of (x, y, t) points in shared memory, one writer process and one reader process
+    # header holds number of points written so far, it is updated after the points,
+    # lidar frame counters (received, processed, dropped) of the writer
+    # and number of points written when the write in progress is done, it is updated before the points (seqlock) -
+    # reader checks it after copying and drops points which could have been overwritten meanwhile
+    # points are stored twice (i and i+size) so reader always gets one contiguous view
+    # creating process owns the block and unlinks it, spawned processes share its resource tracker
+
+    HEADER = 8 # int64 slots
+    WRITING = 4 # header slot of points count after write in progress
+
+    def __init__(self, size: int, name: str | None = None):
+        create = name is None
+        nbytes = 8 * (self.HEADER + 2 * size * 3)
+        self._shm = shared_memory.SharedMemory(name=name, create=create, size=nbytes)
+        self.size = size
+        buf = self._shm.buf
+        self._header = np.ndarray((self.HEADER,), dtype=np.int64, buffer=buf)
+        self.counters = self._header[1:4]
+        self._xy = np.ndarray((2 * size, 2), dtype=np.float64, buffer=buf, offset=8 * self.HEADER)
+        self._t = np.ndarray((2 * size,), dtype=np.float64, buffer=buf, offset=8 * (self.HEADER + 4 * size))
+        if create:
+            self._header[:] = 0
+        self._read = int(self._header[0])
+        self.lost = 0 # points overwritten before they were read
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def write(self, xy: np.ndarray, t: np.ndarray):
+        count = int(self._header[0])
+        self._header[self.WRITING] = count + len(xy)
+        skip = max(0, len(xy) - self.size)
+        for dst, src in mirror_slices((count + skip) % self.size, len(xy) - skip, self.size):
+            self._xy[dst] = xy[skip:][src]
+            self._t[dst] = t[skip:][src]
+        self._header[0] = count + len(xy)
+
+    def read(self) -> tuple[np.ndarray, np.ndarray]:
+        # copies of points written since last read, without points overwritten by writer while copying
+        count = int(self._header[0])
+        start = max(self._read, count - self.size)
+        base = count % self.size + self.size - count
+        s = slice(base + start, base + count)
+        xy = self._xy[s].copy()
+        t = self._t[s].copy()
+        overwritten = min(count, max(start, int(self._header[self.WRITING]) - self.size)) - start
+        self.lost += start - self._read + overwritten
+        self._read = count
+        return xy[overwritten:], t[overwritten:]
+
+    def close(self):
+        del self._header, self.counters, self._xy, self._t
+        self._shm.close()
+
+    def unlink(self):
+        self._shm.unlink()
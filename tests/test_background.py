@@ -0,0 +1,31 @@
+import numpy as np
+
+from lidar import background
+
+
+def calibrated(model: background.BackgroundModel, angles: np.ndarray, dist: np.ndarray):
+    model.apply(angles, dist, 0.0)
+    model.apply(angles, dist, model.calibration)
+    assert not model.calibrating
+
+
+def test_touching_hand_is_not_learned():
+    # bin without static return, hand touching at 500 mm once per revolution for a long time
+    model = background.BackgroundModel(1000, adapt=60)
+    angle = np.array([9000])
+    calibrated(model, angle, np.array([1000.0]))
+    hand = np.array([500.0])
+    for i in range(3 * 60 * background.SCAN_FREQUENCY):
+        assert model.apply(angle, hand, model.calibration + i / background.SCAN_FREQUENCY).all()
+    assert model.range[model._bin[9000]] == 1000
+
+
+def test_background_moving_away_is_followed():
+    model = background.BackgroundModel(2000, adapt=1)
+    angle = np.array([0])
+    calibrated(model, angle, np.array([800.0]))
+    wall = np.array([1200.0])
+    for i in range(10 * background.SCAN_FREQUENCY):
+        model.apply(angle, wall, model.calibration + i / background.SCAN_FREQUENCY)
+    assert abs(model.range[0] - 1200) < 10
+    assert model.apply(angle, np.array([1000.0]), model.calibration + 10).all()
@@ -0,0 +1,83 @@
+import math as m
+import numpy as np
+
+from lidar import decoder
+from bench import synthetic
+
+AREA = dict(x_min=-775, y_min=-700, x_max=775, y_max=-100, min_intensity=220, max_intensity=500, min_distance=50, max_distance=1044.33, angle=-9000, resolution=5)
+
+
+class ReferenceDecoder:
+    # per point loop the vectorized decoder replaced
+
+    def __init__(self, x_min, y_min, x_max, y_max, min_intensity, max_intensity, min_distance, max_distance, angle, resolution):
+        self.x_min, self.y_min, self.x_max, self.y_max = x_min, y_min, x_max, y_max
+        self.min_intensity, self.max_intensity = min_intensity, max_intensity
+        self.min_distance, self.max_distance = min_distance, max_distance
+        self.angle = angle
+        self.resolution = resolution
+        self.last_pos = (0,0)
+        self.last_dist = None
+
+    def decode(self, frame) -> list[tuple[float, float]]:
+        points = []
+        for (dist, intensity), angle in zip(
+            frame['points'].tolist(),
+            np.linspace(
+                m.pi*(int(frame['start_angle'])+self.angle)/18000,
+                m.pi*(int(frame['end_angle'])+self.angle)/18000,
+                num=decoder.POINTS_PER_FRAME
+            )
+        ):
+            if self.last_dist is None or abs(self.last_dist - dist) < self.max_distance:
+                self.last_dist = dist
+            else:
+                self.last_dist = None
+                break
+
+            if (
+                self.min_intensity < intensity < self.max_intensity
+                and self.min_distance < dist < self.max_distance
+            ):
+                y = -dist*m.cos(angle)
+                x = dist*m.sin(angle)
+                if (
+                    self.x_min < x < self.x_max
+                    and self.y_min < y < self.y_max
+                    and not all(np.isclose((x,y), self.last_pos, atol=self.resolution))
+                ):
+                    self.last_pos = (x,y)
+                    points.append((x,y))
+        return points
+
+
+def random_frames(count: int, seed: int = 1) -> np.ndarray:
+    # frames of a turning lidar with noise, occasional glitches and no frame crossing 0 deg
+    rng = np.random.default_rng(seed)
+    data = []
+    for i in range(count):
+        start = (i * 800) % 36000
+        distances = np.where(rng.random(decoder.POINTS_PER_FRAME) < 0.02, 60000, rng.integers(0, 2000, decoder.POINTS_PER_FRAME))
+        intensities = rng.integers(150, 256, decoder.POINTS_PER_FRAME)
+        data.append(synthetic.encode_frame(start, start + 750, distances, intensities))
+    return np.frombuffer(b''.join(data), dtype=decoder.FRAME_DTYPE)
+
+
+def test_decoder_matches_reference_loop():
+    frames = random_frames(3000)
+    reference = ReferenceDecoder(**AREA)
+    expected = np.array([p for frame in frames for p in reference.decode(frame)])
+
+    points = decoder.FrameDecoder(**AREA).decode(frames)
+    assert len(expected) > 500
+    assert points.shape == expected.shape
+    # angles are rounded to lidar units of 0.01 deg
+    np.testing.assert_allclose(points, expected, atol=0.1)
+
+
+def test_decoder_result_does_not_depend_on_batching():
+    frames = random_frames(1000, seed=2)
+    whole = decoder.FrameDecoder(**AREA).decode(frames)
+    batched = decoder.FrameDecoder(**AREA)
+    parts = np.concatenate([batched.decode(frames[i:i+37]) for i in range(0, len(frames), 37)])
+    np.testing.assert_array_equal(whole, parts)
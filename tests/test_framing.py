@@ -0,0 +1,57 @@
+import numpy as np
+
+from lidar import decoder, framing
+from bench import synthetic
+
+# example frame of LD19 protocol description, last byte is its crc
+EXAMPLE = bytes.fromhex('542C6808AB7EE000E4DC00E2D900E5D500E3D300E4D000E9CD00E4CA00E2C700E9C500E5C200E5C000E5BE823A1A50')
+
+
+def reference_crc8(data: bytes) -> int:
+    crc = 0
+    for byte in data:
+        crc = int(framing.CRC_TABLE[crc ^ byte])
+    return crc
+
+
+def test_crc8_of_example_frame():
+    frame = np.frombuffer(EXAMPLE, dtype=decoder.FRAME_DTYPE)
+    assert framing.crc8(frame)[0] == 0x50 == frame['crc8'][0]
+
+
+def test_crc8_matches_byte_loop():
+    rng = np.random.default_rng(0)
+    frames = rng.integers(0, 256, (100, framing.FRAME_SIZE), dtype=np.uint8)
+    expected = [reference_crc8(frame[:-1].tobytes()) for frame in frames]
+    assert framing.crc8(frames.view(decoder.FRAME_DTYPE).ravel()).tolist() == expected
+
+
+def test_frame_sync_recovers_intact_frames():
+    # stream with garbage between frames, frames with flipped bits and reads split at random
+    rng = np.random.default_rng(1)
+    stream = b''
+    intact = []
+    corrupt = 0
+    for i in range(3000):
+        frame = bytearray(synthetic.encode_frame(i % 36000, (i + 750) % 36000, rng.integers(0, 2000, 12), rng.integers(0, 256, 12), timestamp=i))
+        if rng.random() < 0.02:
+            frame[rng.integers(2, len(frame))] ^= 1 << int(rng.integers(0, 8))
+            corrupt += 1
+        else:
+            intact.append(i)
+        stream += frame
+        if rng.random() < 0.02:
+            stream += bytes([decoder.HEADER, decoder.VER_LEN, decoder.HEADER]) + bytes(int(rng.integers(0, 60)))
+
+    sync = framing.FrameSync(256)
+    timestamps = []
+    pos = 0
+    while pos < len(stream):
+        n = int(rng.integers(1, 400))
+        for frames in sync.feed(stream[pos:pos + n]):
+            timestamps += frames['timestamp'].tolist()
+        pos += n
+
+    assert timestamps == intact
+    assert sync.frames == len(intact)
+    assert sync.bad_crc >= corrupt
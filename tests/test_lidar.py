@@ -0,0 +1,37 @@
+import pytest
+
+import lidar
+import models
+from bench import cases, synthetic
+
+
+def two_lidars() -> models.PaintingFile:
+    painting = synthetic.painting_file(cases.PAINTING)
+    second = models.painting_file.LidarConfig(x=775, y=700, angle=-90)
+    return painting.model_copy(update={"lidar": [painting.lidars[0], second]})
+
+
+@pytest.mark.parametrize("update", [
+    {"serial": "/dev/ttyS0"},
+    {"serial": ["/dev/ttyS0"]},
+    {"serial": ["/dev/ttyS0", "/dev/ttyS1"], "replay": ["a.ld19"]},
+])
+def test_lidar_values_must_match_painting_lidars(update):
+    conf = cases.config()
+    conf.lidar = conf.lidar.model_copy(update=update)
+    with pytest.raises(ValueError):
+        lidar.Lidar().configure(conf, two_lidars(), 1)
+
+
+def test_lidar_values_for_every_lidar():
+    conf = cases.config()
+    conf.lidar = conf.lidar.model_copy(update={"serial": ["/dev/ttyS0", "/dev/ttyS1"], "replay": ["a.ld19", "b.ld19"]})
+    group = lidar.LidarGroup()
+    group.configure(conf, two_lidars())
+    assert [sensor._serial for sensor in group.sensors] == ["/dev/ttyS0", "/dev/ttyS1"]
+    assert [sensor._replay for sensor in group.sensors] == ["a.ld19", "b.ld19"]
+
+
+def test_synthetic_scene_of_painting_with_more_lidars():
+    painting = two_lidars()
+    assert synthetic.Scene(painting, index=1).lidar.x == 775
@@ -0,0 +1,31 @@
+from bench import cases, synthetic
+
+
+def changes(records: list[dict]) -> list[tuple]:
+    return [(r["param"], r["value"], r["frame_time"]) for r in records]
+
+
+def test_replay_is_the_same_at_any_speed(tmp_path):
+    painting = synthetic.painting_file(cases.PAINTING)
+    path = str(tmp_path / "touches.ld19")
+    cases.touch_capture(path, painting, cycles=3)
+
+    fast = cases.replay_sound(path, painting, speed=0)
+    scaled = cases.replay_sound(path, painting, speed=4)
+    # default value, then touch and release in every cycle
+    assert [r["value"] for r in fast] == [0, 1, 0, 1, 0, 1, 0]
+    assert changes(fast) == changes(scaled)
+
+
+def test_tracked_touch_activates_area_within_two_revolutions(tmp_path):
+    from lidar import capture
+    painting = synthetic.painting_file(cases.PAINTING)
+    path = str(tmp_path / "touches.ld19")
+    cases.touch_capture(path, painting, cycles=1)
+    reader = capture.CaptureReader(path)
+    start = reader.start_time
+    reader.close()
+
+    records = cases.replay_sound(path, painting, speed=0, tracking=True)
+    touch = next(r for r in records if r["value"] == 1)
+    assert touch["time"] - start < 0.2 # capture time when parameter was set
@@ -0,0 +1,89 @@
+import multiprocessing
+import time
+import numpy as np
+
+from state.points import PointRing
+from state.shared import SharedPointRing
+
+
+def test_point_ring_wraparound():
+    ring = PointRing(7, 2)
+    rng = np.random.default_rng(0)
+    written = np.empty((0, 2))
+    for _ in range(200):
+        n = int(rng.integers(0, 12))
+        xy = rng.random((n, 2))
+        t = np.arange(len(written), len(written) + n, dtype=float)
+        ring.write(xy, t, (1, 2, 3), np.zeros((n, 2), dtype=bool))
+        written = np.concatenate((written, xy))
+
+        view = ring.last()
+        np.testing.assert_array_equal(view.xy, written[-7:])
+        np.testing.assert_array_equal(view.t, np.arange(max(0, len(written) - 7), len(written)))
+        assert view.xy.base is not None # view, not copy
+        assert len(ring.since(len(written) - 3.5).t) == min(3, len(written))
+    assert ring.count == len(written)
+
+
+def test_shared_ring_wraparound_and_lost_points():
+    ring = SharedPointRing(8)
+    reader = SharedPointRing(8, ring.name)
+    try:
+        total = 0
+        for n in (3, 5, 6, 20, 0, 8, 1):
+            xy = np.arange(total, total + n, dtype=float).repeat(2).reshape(-1, 2)
+            ring.write(xy, xy[:,0])
+            total += n
+            read_xy, t = reader.read()
+            # only last size points survive a write
+            np.testing.assert_array_equal(t, np.arange(total - min(n, 8), total))
+            np.testing.assert_array_equal(read_xy[:,0], t)
+        assert reader.lost == 12
+
+        ring.write(np.zeros((5, 2)), np.zeros(5))
+        ring.write(np.ones((5, 2)), np.ones(5))
+        xy, t = reader.read()
+        assert len(t) == 8 and reader.lost == 14
+        assert reader.read()[1].size == 0
+    finally:
+        reader.close()
+        ring.close()
+        ring.unlink()
+
+
+def write_sequence(name, stop):
+    ring = SharedPointRing(64, name)
+    i = 0
+    while not stop.is_set():
+        seq = np.arange(i, i + 50, dtype=float)
+        ring.write(np.column_stack((seq, seq)), seq)
+        i += 50
+    ring.close()
+
+
+def test_shared_ring_reader_never_gets_overwritten_points():
+    # writer process laps the small ring all the time, points read must be consistent and in sequence
+    ctx = multiprocessing.get_context('spawn')
+    ring = SharedPointRing(64)
+    stop = ctx.Event()
+    writer = ctx.Process(target=write_sequence, args=(ring.name, stop))
+    writer.start()
+    try:
+        got = 0
+        last = -1
+        end = time.time() + 1
+        while time.time() < end:
+            xy, t = ring.read()
+            np.testing.assert_array_equal(xy[:,0], t)
+            np.testing.assert_array_equal(np.diff(t), 1)
+            got += len(t)
+            if len(t):
+                assert t[0] > last
+                last = t[-1]
+                assert got + ring.lost == last + 1 # every point written is read or counted as lost
+        assert got > 0
+    finally:
+        stop.set()
+        writer.join()
+        ring.close()
+        ring.unlink()
@@ -0,0 +1,37 @@
+import asyncio
+import os
+import numpy as np
+
+import state
+from bench import cases, synthetic
+
+
+def configured(**update) -> state.State:
+    conf = cases.config()
+    conf.state = conf.state.model_copy(update=update)
+    st = state.State()
+    st.configure(conf, synthetic.painting_file(cases.PAINTING))
+    return st
+
+
+def test_points_are_counted_when_heatmap_cannot_be_saved(tmp_path):
+    # parent of heatmap file is not writable - saving fails, areas still work
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    st = configured(heatmap_file=str(blocker / "heatmap.npz"), heatmap_save_period=0)
+    area = st._areas[0].rect
+    st.add_points(np.array([[area.x + 5, area.y + 5]] * 5, dtype=float))
+    assert st._areas_counts.sum() >= 5
+    assert st.get_current_area() is st._areas[0]
+
+
+def test_heatmap_is_saved_in_thread_pool_to_new_directory(tmp_path):
+    path = tmp_path / "captures" / "heatmap.npz"
+    st = configured(heatmap_file=str(path), heatmap_save_period=0)
+
+    async def add():
+        st.add_points(np.array([[100.0, 100.0]]))
+        await asyncio.sleep(0) # asyncio.run waits for thread pool
+
+    asyncio.run(add())
+    assert os.path.exists(path)